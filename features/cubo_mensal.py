@@ -0,0 +1,276 @@
+import os
+
+import pandas as pd
+import numpy as np
+
+from features.indice_transacoes import IndiceTransacoes
+
+
+class CuboMensal:
+    """
+    Cubo denso cliente x mês com os agregados das transações de cada mês:
+
+    - qtde         : int32, quantidade de transações.
+    - soma         : float64, soma dos valores (nulos contam como 0).
+    - primeiro_dia : int32, dia (desde 1970-01-01) da primeira transação do mês.
+    - ultimo_dia   : int32, dia da última transação do mês.
+    - maximo       : float64, maior valor do mês (NaN sem valores).
+    - minimo       : float64, menor valor do mês (NaN sem valores).
+    - valor_ultimo : float64, valor da última transação do mês (em empates no
+                     último dia, a primeira na ordem de df_tx).
+
+    Linhas seguem `clientes` (mesmos códigos do IndiceTransacoes) e colunas seguem
+    `meses` (datetime64[M] contínuos, do primeiro ao último mês com transação).
+
+    Como todas as janelas das features são meses fechados terminando no cutoff,
+    qualquer janela vira uma diferença de somas acumuladas ao longo do eixo dos
+    meses (e os extremos até o cutoff, máximos/mínimos acumulados), de modo que
+    novas janelas/safras custam apenas uma consulta vetorizada.
+    O cubo pode ser persistido (salvar/carregar) em .npy ou Parquet.
+    """
+
+    _ARQUIVO_PARQUET = "cubo_mensal.parquet"
+    _MATRIZES = ["qtde", "soma", "primeiro_dia", "ultimo_dia",
+                 "maximo", "minimo", "valor_ultimo"]
+
+    def __init__(self, clientes, meses, qtde, soma, primeiro_dia, ultimo_dia,
+                 maximo, minimo, valor_ultimo):
+        self.clientes = pd.Index(clientes)
+        self.meses = np.asarray(meses, dtype="datetime64[M]")
+        self.qtde = np.asarray(qtde, dtype=np.int32)
+        self.soma = np.asarray(soma, dtype=np.float64)
+        self.primeiro_dia = np.asarray(primeiro_dia, dtype=np.int32)
+        self.ultimo_dia = np.asarray(ultimo_dia, dtype=np.int32)
+        self.maximo = np.asarray(maximo, dtype=np.float64)
+        self.minimo = np.asarray(minimo, dtype=np.float64)
+        self.valor_ultimo = np.asarray(valor_ultimo, dtype=np.float64)
+        self._preparar_acumulados()
+
+    @classmethod
+    def de_transacoes(cls, df_tx,
+                      id_col: str = "id_cliente",
+                      dt_col: str = "data_transacao",
+                      val_col: str = "valor_transacao") -> "CuboMensal":
+        """
+        Constrói o cubo com um único groupby (cliente, mês) sobre as transações.
+        df_tx pode ser o DataFrame pré-processado ou um IndiceTransacoes.
+        """
+        if isinstance(df_tx, IndiceTransacoes):
+            indice = df_tx
+        else:
+            indice = IndiceTransacoes(df_tx, id_col, dt_col, val_col)
+
+        n_clientes = len(indice.clientes)
+        mes = indice.dias.astype("datetime64[D]").astype("datetime64[M]")
+
+        if len(mes) == 0:
+            vazio = np.zeros((n_clientes, 0))
+            return cls(indice.clientes, np.array([], dtype="datetime64[M]"),
+                       *[vazio] * len(cls._MATRIZES))
+
+        mes_inicial = mes.min()
+        pos_mes = (mes - mes_inicial).astype(np.int64)
+        n_meses = int(pos_mes.max()) + 1
+        valores = indice.valores if indice.valores is not None else np.zeros(len(indice))
+
+        # transações na ordem do índice: (cliente, dia) e, no mesmo dia, df_tx
+        tx = pd.DataFrame({"c": indice.codigos, "m": pos_mes,
+                           "v": valores, "d": indice.dias})
+        agg = (
+            tx.groupby(["c", "m"], sort=False)
+            .agg(qtde=("d", "size"), soma=("v", "sum"),
+                 primeiro_dia=("d", "min"), ultimo_dia=("d", "max"),
+                 maximo=("v", "max"), minimo=("v", "min"))
+            .reset_index()
+        )
+        # valor da primeira transação do último dia de cada mês (mesmo nulo)
+        no_ultimo_dia = tx["d"] == tx.groupby(["c", "m"], sort=False)["d"].transform("max")
+        ultimas = tx[no_ultimo_dia].drop_duplicates(["c", "m"])
+
+        formato = (n_clientes, n_meses)
+        matrizes = {nome: np.zeros(formato) for nome in cls._MATRIZES}
+        for nome in ["maximo", "minimo", "valor_ultimo"]:
+            matrizes[nome][:] = np.nan
+        linhas, colunas = agg["c"].to_numpy(), agg["m"].to_numpy()
+        for nome in ["qtde", "soma", "primeiro_dia", "ultimo_dia", "maximo", "minimo"]:
+            matrizes[nome][linhas, colunas] = agg[nome].to_numpy()
+        linhas, colunas = ultimas["c"].to_numpy(), ultimas["m"].to_numpy()
+        matrizes["valor_ultimo"][linhas, colunas] = ultimas["v"].to_numpy()
+
+        meses = mes_inicial + np.arange(n_meses)
+        return cls(indice.clientes, meses, **matrizes)
+
+    def _preparar_acumulados(self):
+        """
+        Estruturas derivadas (não persistidas), com uma linha extra zerada ao
+        final usada por clientes sem transação:
+        - _acum_qtde/_acum_soma : somas acumuladas no eixo dos meses, com uma
+          coluna inicial de zeros ([:, j] = total dos meses < j).
+        - _acum_max/_acum_min : maior/menor valor dos meses < j (NaN se não houver).
+        - _proximo  : [:, j] = primeiro mês >= j com transação (n_meses se não houver).
+        - _anterior : [:, j] = último mês < j com transação (-1 se não houver).
+        """
+        n_clientes, n_meses = self.qtde.shape
+        qtde = np.vstack([self.qtde, np.zeros((1, n_meses), dtype=np.int32)])
+        soma = np.vstack([self.soma, np.zeros((1, n_meses))])
+
+        zeros = np.zeros((n_clientes + 1, 1))
+        self._acum_qtde = np.hstack([zeros.astype(np.int64), np.cumsum(qtde, axis=1)])
+        self._acum_soma = np.hstack([zeros, np.cumsum(soma, axis=1)])
+
+        nulos = np.full((n_clientes + 1, 1), np.nan)
+        maximo = np.vstack([self.maximo, np.full((1, n_meses), np.nan)])
+        minimo = np.vstack([self.minimo, np.full((1, n_meses), np.nan)])
+        if n_meses:
+            maximo = np.fmax.accumulate(maximo, axis=1)
+            minimo = np.fmin.accumulate(minimo, axis=1)
+        self._acum_max = np.hstack([nulos, maximo])
+        self._acum_min = np.hstack([nulos, minimo])
+
+        colunas = np.arange(n_meses)
+        tem_tx = qtde > 0
+
+        anterior = np.where(tem_tx, colunas, -1)
+        anterior = np.maximum.accumulate(anterior, axis=1) if n_meses else anterior
+        self._anterior = np.hstack([np.full((n_clientes + 1, 1), -1), anterior])
+
+        proximo = np.where(tem_tx, colunas, n_meses)[:, ::-1]
+        proximo = np.minimum.accumulate(proximo, axis=1)[:, ::-1] if n_meses else proximo
+        self._proximo = np.hstack([proximo, np.full((n_clientes + 1, 1), n_meses)])
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelas matrizes persistidas do cubo (bytes)."""
+        return sum(getattr(self, nome).nbytes for nome in self._MATRIZES)
+
+    def codificar(self, ids) -> np.ndarray:
+        """
+        Código de cada id no cubo (-1 se o cliente não possui nenhuma transação).
+        """
+        return self.clientes.get_indexer(pd.Index(ids))
+
+    def posicao_mes(self, dias: np.ndarray) -> np.ndarray:
+        """
+        Posição, no eixo dos meses do cubo, do mês de cada dia (pode ficar fora
+        de [0, n_meses) quando o dia é anterior/posterior às transações).
+        """
+        mes = np.asarray(dias).astype("datetime64[D]").astype("datetime64[M]")
+        if len(self.meses) == 0:
+            return np.zeros(len(mes), dtype=np.int64)
+        return (mes - self.meses[0]).astype(np.int64)
+
+    def _linhas(self, codigos: np.ndarray) -> np.ndarray:
+        return np.where(codigos < 0, len(self.clientes), codigos)
+
+    def janela(self, codigos: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> dict:
+        """
+        Agregados dos meses [lo, hi) de cada cliente:
+        - qtde / soma  : diferença das somas acumuladas nos dois limites.
+        - primeiro_dia : dia da primeira transação da janela (indefinido se qtde == 0).
+        """
+        linhas = self._linhas(codigos)
+        prox = self._proximo[linhas, lo]
+        prox_valido = np.minimum(prox, max(len(self.meses) - 1, 0))
+        primeiro = (self.primeiro_dia[np.minimum(linhas, len(self.clientes) - 1), prox_valido]
+                    if self.primeiro_dia.size else np.zeros(len(linhas), dtype=np.int32))
+
+        return {
+            "qtde": self._acum_qtde[linhas, hi] - self._acum_qtde[linhas, lo],
+            "soma": self._acum_soma[linhas, hi] - self._acum_soma[linhas, lo],
+            "primeiro_dia": primeiro.astype(np.int64),
+        }
+
+    def ultimo_dia_ate(self, codigos: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """
+        Dia da última transação nos meses < hi de cada cliente (indefinido se não houver).
+        """
+        linhas = self._linhas(codigos)
+        ant = np.maximum(self._anterior[linhas, hi], 0)
+        if not self.ultimo_dia.size:
+            return np.zeros(len(linhas), dtype=np.int64)
+        return self.ultimo_dia[np.minimum(linhas, len(self.clientes) - 1), ant].astype(np.int64)
+
+    def extremos_ate(self, codigos: np.ndarray, hi: np.ndarray) -> dict:
+        """
+        Valores das transações nos meses < hi de cada cliente (NaN se não houver):
+        - ult : valor da última transação.
+        - max / min : maior e menor valor.
+        """
+        linhas = self._linhas(codigos)
+        ant = self._anterior[linhas, hi]
+        if self.valor_ultimo.size:
+            ult = self.valor_ultimo[np.minimum(linhas, len(self.clientes) - 1),
+                                    np.maximum(ant, 0)]
+        else:
+            ult = np.full(len(linhas), np.nan)
+        return {
+            "ult": np.where(ant >= 0, ult, np.nan),
+            "max": self._acum_max[linhas, hi],
+            "min": self._acum_min[linhas, hi],
+        }
+
+    def salvar(self, diretorio: str, formato: str = "npy"):
+        """
+        Persiste o cubo em `diretorio`:
+        - formato="npy"     : uma matriz densa .npy por agregado + clientes/meses.
+        - formato="parquet" : formato longo (uma linha por cliente x mês com
+                              transação) em cubo_mensal.parquet.
+        """
+        os.makedirs(diretorio, exist_ok=True)
+
+        if formato == "npy":
+            np.save(os.path.join(diretorio, "clientes.npy"),
+                    self.clientes.to_numpy().astype(str))
+            np.save(os.path.join(diretorio, "meses.npy"), self.meses)
+            for nome in self._MATRIZES:
+                np.save(os.path.join(diretorio, f"{nome}.npy"), getattr(self, nome))
+
+        elif formato == "parquet":
+            linhas, colunas = np.nonzero(self.qtde)
+            sem_tx = np.setdiff1d(np.arange(len(self.clientes)), linhas)
+            longo = pd.DataFrame({
+                "id_cliente": self.clientes[np.concatenate([linhas, sem_tx])],
+                "mes": np.concatenate([self.meses[colunas],
+                                       np.full(len(sem_tx), np.datetime64("NaT", "M"))]),
+                **{nome: np.concatenate([getattr(self, nome)[linhas, colunas],
+                                         np.zeros(len(sem_tx))])
+                   for nome in self._MATRIZES},
+            })
+            longo["mes"] = longo["mes"].astype("datetime64[ns]")
+            for col in ["qtde", "primeiro_dia", "ultimo_dia"]:
+                longo[col] = longo[col].astype(np.int32)
+            longo.to_parquet(os.path.join(diretorio, self._ARQUIVO_PARQUET), index=False)
+
+        else:
+            raise ValueError(f"formato inválido: {formato!r} (use 'npy' ou 'parquet').")
+
+    @classmethod
+    def carregar(cls, diretorio: str) -> "CuboMensal":
+        """Lê um cubo salvo com `salvar` (detecta o formato pelo conteúdo)."""
+        caminho_parquet = os.path.join(diretorio, cls._ARQUIVO_PARQUET)
+
+        if not os.path.exists(caminho_parquet):
+            matrizes = {nome: np.load(os.path.join(diretorio, f"{nome}.npy"))
+                        for nome in ["clientes", "meses"] + cls._MATRIZES}
+            return cls(**matrizes)
+
+        longo = pd.read_parquet(caminho_parquet)
+        clientes = pd.Index(np.sort(longo["id_cliente"].unique()))
+        com_tx = longo[longo["mes"].notna()]
+        mes = com_tx["mes"].to_numpy().astype("datetime64[M]")
+
+        if len(mes):
+            meses = mes.min() + np.arange((mes.max() - mes.min()).astype(int) + 1)
+        else:
+            meses = np.array([], dtype="datetime64[M]")
+
+        formato = (len(clientes), len(meses))
+        linhas = clientes.get_indexer(com_tx["id_cliente"])
+        colunas = (mes - meses[0]).astype(np.int64) if len(mes) else mes.astype(np.int64)
+        matrizes = {}
+        for nome in cls._MATRIZES:
+            vazio = np.nan if nome in ("maximo", "minimo", "valor_ultimo") else 0
+            matrizes[nome] = np.full(formato, vazio, dtype=float)
+            matrizes[nome][linhas, colunas] = com_tx[nome].to_numpy()
+
+        return cls(clientes, meses, **matrizes)
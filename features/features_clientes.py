@@ -11,7 +11,8 @@ def features_clientes(df_cli: pd.DataFrame,
                       limite_col: str = "limite_credito",
                       qtde_prod_col: str = "qtde_produtos",
                       ref_col: str = "data_referencia",
-                      usar_M_1: bool = True) -> pd.DataFrame:
+                      usar_M_1: bool = True,
+                      vetorizado: bool = True) -> pd.DataFrame:
     """
     Gera features de clientes combinando atributos cadastrais (originais) e derivadas.
 
@@ -30,8 +31,19 @@ def features_clientes(df_cli: pd.DataFrame,
         * idade2
         * log_renda
         * renda_por_limite
+
+    Execução:
+    ---------
+    - vetorizado=True (padrão): um único merge (left) de df_inad com df_cli e
+      cálculo das derivadas por coluna inteira.
+    - vetorizado=False: implementação original linha a linha (referência).
     """
 
+    if vetorizado:
+        return _features_clientes_vetorizado(df_cli, df_inad, id_col, dt_abertura_col,
+                                             idade_col, renda_col, limite_col,
+                                             ref_col, usar_M_1)
+
     cli_index = df_cli.set_index(id_col)
     registros = []
 
@@ -86,3 +98,44 @@ def features_clientes(df_cli: pd.DataFrame,
         registros.append(registro)
 
     return pd.DataFrame(registros).sort_values([id_col, ref_col]).reset_index(drop=True)
+
+
+def anos_relacionamento(ref_date: pd.Series,
+                        dt_abertura: pd.Series,
+                        usar_M_1: bool = True) -> pd.Series:
+    """
+    Tempo de relacionamento (anos, 4 casas) no cutoff de cada data de
+    referência; NaN se a conta não tem data de abertura ou foi aberta depois
+    do cutoff.
+    """
+    cutoff = (ref_date - pd.offsets.MonthEnd(1)) if usar_M_1 else ref_date
+    anos_rel = ((cutoff - dt_abertura).dt.days / 365.25).round(4)
+    return anos_rel.where(cutoff > dt_abertura)
+
+
+def _features_clientes_vetorizado(df_cli, df_inad, id_col, dt_abertura_col,
+                                  idade_col, renda_col, limite_col, ref_col,
+                                  usar_M_1):
+    """
+    Versão vetorizada de features_clientes: left join de df_inad com df_cli
+    seguido do cálculo das features derivadas sobre colunas inteiras.
+    """
+    df = df_inad[[id_col, ref_col]].merge(df_cli, on=id_col, how="left")
+
+    # tempo de relacionamento (anos)
+    if dt_abertura_col in df.columns:
+        anos_rel = anos_relacionamento(df[ref_col], df[dt_abertura_col], usar_M_1)
+    else:
+        anos_rel = pd.Series(np.nan, index=df.index)
+
+    # features derivadas
+    renda = df[renda_col]
+    limite = df[limite_col]
+
+    feats = df[[c for c in df_cli.columns if c != id_col] + [id_col, ref_col]].copy()
+    feats["tempo_relacionamento_anos"] = anos_rel
+    feats["idade2"] = df[idade_col] ** 2
+    feats["log_renda"] = np.log1p(renda)
+    feats["renda_por_limite"] = (renda / limite).where(renda.notna() & (limite > 0))
+
+    return feats.sort_values([id_col, ref_col]).reset_index(drop=True)
@@ -1,13 +1,18 @@
 import pandas as pd
 import numpy as np
 
+from features.janelas import (especificar_janelas, preparar_contexto, aplicar_nan,
+                              exigir_dataframe)
+
 
 def features_flags_flex(df_tx: pd.DataFrame,
                         df_inad: pd.DataFrame,
                         id_col: str = "id_cliente",
                         dt_col: str = "data_transacao",
                         ref_col: str = "data_referencia",
-                        usar_M_1: bool = True) -> pd.DataFrame:
+                        usar_M_1: bool = True,
+                        janelas=None,
+                        vetorizado: bool = True) -> pd.DataFrame:
     """
     Gera variáveis de FLAGS de existência de transação, com janelas em meses fechados.
 
@@ -26,12 +31,32 @@ def features_flags_flex(df_tx: pd.DataFrame,
         * 0 → cliente tem histórico, mas não nessa janela
         * NaN → cliente nunca transacionou
 
-    Janelas: 1m, 3m, 6m, 9m, 12m, 24m, ever.
+    Janelas: 1m, 3m, 6m, 9m, 12m, 24m, ever (padrão). O argumento `janelas` aceita
+    outro conjunto de meses (ver features.janelas.especificar_janelas).
+
+    Execução:
+    ---------
+    - vetorizado=True (padrão): ordena df_tx uma única vez por (cliente, data) e
+      resolve os limites de todas as janelas com `searchsorted`, sem laço por linha.
+    - vetorizado=False: implementação original linha a linha (referência).
+    - df_tx pode ser um IndiceTransacoes já construído (features.indice_transacoes),
+      evitando reordenar as transações a cada chamada (somente vetorizado=True).
+      Também aceita um CuboMensal (features.cubo_mensal) quando os cutoffs caem no
+      último dia do mês.
     """
 
+    espec = especificar_janelas(janelas)
+    janelas = espec["janelas"]
+
+    if vetorizado:
+        contexto = preparar_contexto(df_tx, df_inad, espec, id_col, dt_col,
+                                     ref_col, usar_M_1)
+        return pd.DataFrame({id_col: df_inad[id_col].to_numpy(),
+                             ref_col: df_inad[ref_col].to_numpy(),
+                             **colunas_flags(contexto)})
+
+    exigir_dataframe(df_tx, "features_flags_flex")
     resultados = []
-    janelas = {"1m": 1, "3m": 3, "6m": 6, "9m": 9,
-               "12m": 12, "24m": 24, "ever": None}
     clientes_com_tx = set(df_tx[id_col].unique())
 
     for _, row in df_inad.iterrows():
@@ -73,3 +98,22 @@ def features_flags_flex(df_tx: pd.DataFrame,
         resultados.append({id_col: cid, ref_col: ref_date, **feats})
 
     return pd.DataFrame(resultados)
+
+
+def colunas_flags(contexto: dict) -> dict:
+    """
+    Colunas de features_flags_flex a partir de um contexto de janelas já resolvido
+    (ver features.janelas.preparar_contexto), usando a quantidade de transações
+    de cada janela.
+    """
+    qtde = contexto["qtde"]
+
+    # histórico vazio até o cutoff (ou cliente sem nenhuma transação)
+    sem_hist = contexto["sem_tx"] | (qtde["ever"] == 0)
+
+    feats = {"flag_nunca_transacionou": sem_hist.astype(np.int64)}
+    for label in contexto["janelas"].keys():
+        feats[f"flag_transacao_{label}"] = aplicar_nan(
+            (qtde[label] > 0).astype(np.int64), sem_hist)
+
+    return feats
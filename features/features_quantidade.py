@@ -1,19 +1,26 @@
 import pandas as pd
 import numpy as np
 
+from features.janelas import (especificar_janelas, preparar_contexto, razao_vizinha,
+                              aplicar_nan, exigir_dataframe)
+
 
 def features_quantidade_flex(df_tx: pd.DataFrame,
                              df_inad: pd.DataFrame,
                              id_col="id_cliente",
                              dt_col="data_transacao",
                              ref_col="data_referencia",
-                             usar_M_1=False) -> pd.DataFrame:
+                             usar_M_1=False,
+                             janelas=None,
+                             vetorizado=True) -> pd.DataFrame:
     """
     Gera variáveis de QUANTIDADE de transações, com referência na base de inadimplência.
 
     Variáveis criadas:
     -----------------
     - qtde_trans_Xm : quantidade de transações no período (X = 1,3,6,9,12,24,ever)
+                      O argumento `janelas` aceita outro conjunto de meses e
+                      comparações (ver features.janelas.especificar_janelas).
     - pct_qtde_trans_Xm : proporção (%) das transações no período X em relação ao total ever
     - comp_qtde_A_vs_B : razão entre quantidades de períodos vizinhos
                          * NaN → ambos zero
@@ -24,13 +31,31 @@ def features_quantidade_flex(df_tx: pd.DataFrame,
     ------------------
     - NaN → cliente não tem nenhuma transação no histórico
     - 0   → não houve transações no período analisado
+
+    Execução:
+    ------------------
+    - vetorizado=True (padrão): cada qtde_trans_Xm é a diferença entre as contagens
+      acumuladas do cliente nos limites da janela; pct/comp/delta são calculados
+      como operações de coluna inteira.
+    - vetorizado=False: implementação original linha a linha (referência).
+    - df_tx pode ser um IndiceTransacoes já construído (features.indice_transacoes),
+      evitando reordenar as transações a cada chamada (somente vetorizado=True).
+      Também aceita um CuboMensal (features.cubo_mensal) quando os cutoffs caem no
+      último dia do mês.
     """
 
+    espec = especificar_janelas(janelas)
+    janelas, comparacoes = espec["janelas"], espec["comparacoes"]
+
+    if vetorizado:
+        contexto = preparar_contexto(df_tx, df_inad, espec, id_col, dt_col,
+                                     ref_col, usar_M_1)
+        return pd.DataFrame({id_col: df_inad[id_col].to_numpy(),
+                             ref_col: df_inad[ref_col].to_numpy(),
+                             **colunas_quantidade(contexto)})
+
+    exigir_dataframe(df_tx, "features_quantidade_flex")
     resultados = []
-    janelas = {"1m": 1, "3m": 3, "6m": 6, "9m": 9,
-               "12m": 12, "24m": 24, "ever": None}
-    comparacoes = [("1m", "3m"), ("3m", "6m"), ("6m", "9m"),
-                   ("9m", "12m"), ("12m", "24m"), ("24m", "ever")]
 
     clientes_com_tx = set(df_tx[id_col].unique())
 
@@ -44,7 +69,7 @@ def features_quantidade_flex(df_tx: pd.DataFrame,
                 id_col: cid,
                 ref_col: ref_date,
                 **{f"qtde_trans_{k}": np.nan for k in janelas.keys()},
-                **{f"pct_qtde_trans_{k}": np.nan for k in ["1m", "3m", "6m", "12m", "24m"]},
+                **{f"pct_qtde_trans_{k}": np.nan for k in espec["pct"]},
                 **{f"comp_qtde_{a}_vs_{b}": np.nan for a, b in comparacoes},
                 **{f"delta_qtde_{a}_vs_{b}": np.nan for a, b in comparacoes}
             })
@@ -64,7 +89,7 @@ def features_quantidade_flex(df_tx: pd.DataFrame,
 
         # Proporções em relação ao total (ever)
         qtde_ever = feats["qtde_trans_ever"]
-        for label in ["1m", "3m", "6m", "12m", "24m"]:
+        for label in espec["pct"]:
             v1 = feats[f"qtde_trans_{label}"]
             feats[f"pct_qtde_trans_{label}"] = (
                 np.nan if qtde_ever == 0 else round(100*v1/qtde_ever, 2)
@@ -86,3 +111,36 @@ def features_quantidade_flex(df_tx: pd.DataFrame,
         resultados.append({id_col: cid, ref_col: ref_date, **feats})
 
     return pd.DataFrame(resultados)
+
+
+def colunas_quantidade(contexto: dict) -> dict:
+    """
+    Colunas de features_quantidade_flex a partir de um contexto de janelas já
+    resolvido (ver features.janelas.preparar_contexto), mantendo as convenções
+    de NaN/-1 da versão linha a linha.
+    """
+    janelas, comparacoes = contexto["janelas"], contexto["comparacoes"]
+    sem_tx = contexto["sem_tx"]
+    qtde = contexto["qtde"]
+
+    feats = {}
+
+    # Quantidade por janela
+    for label in janelas.keys():
+        feats[f"qtde_trans_{label}"] = aplicar_nan(qtde[label], sem_tx)
+
+    # Proporções em relação ao total (ever)
+    qtde_ever = qtde["ever"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for label in contexto["pct"]:
+            pct = np.round(100 * qtde[label] / qtde_ever, 2)
+            feats[f"pct_qtde_trans_{label}"] = np.where(
+                sem_tx | (qtde_ever == 0), np.nan, pct)
+
+    # Comparações vizinhas (regra unificada com valor)
+    for a, b in comparacoes:
+        feats[f"comp_qtde_{a}_vs_{b}"] = aplicar_nan(
+            razao_vizinha(qtde[a], qtde[b]), sem_tx)
+        feats[f"delta_qtde_{a}_vs_{b}"] = aplicar_nan(qtde[a] - qtde[b], sem_tx)
+
+    return feats
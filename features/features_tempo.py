@@ -1,13 +1,18 @@
 import pandas as pd
 import numpy as np
 
+from features.janelas import (especificar_janelas, preparar_contexto, aplicar_nan,
+                              exigir_dataframe)
+
 
 def features_tempo_flex(df_tx: pd.DataFrame,
                         df_inad: pd.DataFrame,
                         id_col: str = "id_cliente",
                         dt_col: str = "data_transacao",
                         ref_col: str = "data_referencia",
-                        usar_M_1: bool = True) -> pd.DataFrame:
+                        usar_M_1: bool = True,
+                        janelas=None,
+                        vetorizado: bool = True) -> pd.DataFrame:
     """
     Gera variáveis de TEMPO relacionadas às transações de clientes,
     alinhadas em janelas mensais fechadas.
@@ -28,6 +33,8 @@ def features_tempo_flex(df_tx: pd.DataFrame,
     - Cada janela Xm é formada pelos X meses fechados anteriores ao cutoff.
       Ex.: ref_date = 31/03/2024, usar_M_1=True, janela 3m = dez/23, jan/24, fev/24.
     - "ever": considera todo o histórico do cliente até o cutoff.
+    - Padrão: 1m, 3m, 6m, 9m, 12m, 24m, ever. O argumento `janelas` aceita outro
+      conjunto de meses (ver features.janelas.especificar_janelas).
 
     -------------------------
     Variáveis criadas:
@@ -64,11 +71,33 @@ def features_tempo_flex(df_tx: pd.DataFrame,
     - tempo_desde_ultima_1m   = 8 dias  (31/03 – 23/03)
     - tempo_atividade_1m      = 19 dias (27 – 8)
 
+    -------------------------
+    Execução:
+    -------------------------
+    - vetorizado=True (padrão): com as transações ordenadas por (cliente, data),
+      a primeira transação da janela está na posição de início e a última logo
+      antes da posição do cutoff; todas as linhas são resolvidas de uma vez a
+      partir de vetores de dias inteiros.
+    - vetorizado=False: implementação original linha a linha (referência).
+    - df_tx pode ser um IndiceTransacoes já construído (features.indice_transacoes),
+      evitando reordenar as transações a cada chamada (somente vetorizado=True).
+      Também aceita um CuboMensal (features.cubo_mensal) quando os cutoffs caem no
+      último dia do mês.
+
     """
 
+    espec = especificar_janelas(janelas)
+    janelas = espec["janelas"]
+
+    if vetorizado:
+        contexto = preparar_contexto(df_tx, df_inad, espec, id_col, dt_col,
+                                     ref_col, usar_M_1)
+        return pd.DataFrame({id_col: df_inad[id_col].to_numpy(),
+                             ref_col: df_inad[ref_col].to_numpy(),
+                             **colunas_tempo(contexto)})
+
+    exigir_dataframe(df_tx, "features_tempo_flex")
     resultados = []
-    janelas = {"1m": 1, "3m": 3, "6m": 6, "9m": 9,
-               "12m": 12, "24m": 24, "ever": None}
     clientes_com_tx = set(df_tx[id_col].unique())
 
     for _, row in df_inad.iterrows():
@@ -119,3 +148,24 @@ def features_tempo_flex(df_tx: pd.DataFrame,
         resultados.append({id_col: cid, ref_col: ref_date, **feats})
 
     return pd.DataFrame(resultados)
+
+
+def colunas_tempo(contexto: dict) -> dict:
+    """
+    Colunas de features_tempo_flex a partir de um contexto de janelas já resolvido
+    (ver features.janelas.preparar_contexto), a partir do dia da primeira
+    transação de cada janela e da última transação até o cutoff.
+    """
+    cutoff = contexto["cutoff"]
+    t_ultima = cutoff - contexto["ultima"]
+
+    feats = {}
+    for label in contexto["janelas"].keys():
+        vazia = contexto["sem_tx"] | (contexto["qtde"][label] == 0)
+        t_primeira = cutoff - contexto["primeira"][label]
+
+        feats[f"tempo_desde_primeira_{label}"] = aplicar_nan(t_primeira, vazia)
+        feats[f"tempo_desde_ultima_{label}"] = aplicar_nan(t_ultima, vazia)
+        feats[f"tempo_atividade_{label}"] = aplicar_nan(t_primeira - t_ultima, vazia)
+
+    return feats
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from features.janelas import especificar_janelas, preparar_contexto
+from features.features_valor import colunas_valor
+from features.features_quantidade import colunas_quantidade
+from features.features_tempo import colunas_tempo
+from features.features_flags import colunas_flags
+
+# Construtores de colunas de cada família, na ordem de saída do kernel
+COLUNAS_FAMILIA = {
+    "valor": colunas_valor,
+    "quantidade": colunas_quantidade,
+    "tempo": colunas_tempo,
+    "flags": colunas_flags,
+}
+
+
+def features_transacionais(df_tx: pd.DataFrame,
+                           df_inad: pd.DataFrame,
+                           id_col: str = "id_cliente",
+                           val_col: str = "valor_transacao",
+                           dt_col: str = "data_transacao",
+                           ref_col: str = "data_referencia",
+                           usar_M_1: bool = True,
+                           janelas=None,
+                           familias=None) -> pd.DataFrame:
+    """
+    Kernel fundido das features transacionais: VALOR, QUANTIDADE, TEMPO e FLAGS.
+
+    As janelas de cada (cliente, cutoff) são resolvidas uma única vez (ordenação
+    de df_tx + limites via searchsorted) e reaproveitadas pelas quatro famílias,
+    em vez de cada módulo repetir o mesmo recorte. Janelas adicionais (ex.: 18m,
+    36m) custam apenas uma busca vetorizada de limites a mais. df_tx pode ser o DataFrame de
+    transações ou um IndiceTransacoes já construído.
+
+    janelas : especificação de janelas/comparações (ver
+              features.janelas.especificar_janelas); None usa o conjunto padrão.
+    familias : lista opcional com o subconjunto de famílias a calcular
+               ("valor", "quantidade", "tempo", "flags"); None calcula todas.
+
+    Saída:
+    ------
+    Um DataFrame na ordem de df_inad com id_col, ref_col e as colunas de
+    features_valor_flex, features_quantidade_flex, features_tempo_flex e
+    features_flags_flex (nessa ordem), idênticas às das funções isoladas.
+    """
+    espec = especificar_janelas(janelas)
+    janelas, comparacoes = espec["janelas"], espec["comparacoes"]
+
+    # somas/acumulados de valor só são necessários para a família de valor
+    if familias is not None and "valor" not in familias:
+        val_col = None
+
+    contexto = preparar_contexto(df_tx, df_inad, espec, id_col, dt_col,
+                                 ref_col, usar_M_1, val_col)
+
+    feats = {id_col: df_inad[id_col].to_numpy(),
+             ref_col: df_inad[ref_col].to_numpy()}
+    for familia, colunas in COLUNAS_FAMILIA.items():
+        if familias is None or familia in familias:
+            feats.update(colunas(contexto))
+
+    return pd.DataFrame(feats)
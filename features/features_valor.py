@@ -1,6 +1,10 @@
 import pandas as pd
 import numpy as np
 
+from features.indice_transacoes import para_dias
+from features.janelas import (especificar_janelas, preparar_contexto, dias_inicio_janela,
+                              razao_vizinha, aplicar_nan, exigir_dataframe)
+
 
 def features_valor_flex(df_tx: pd.DataFrame,
                         df_inad: pd.DataFrame,
@@ -8,7 +12,9 @@ def features_valor_flex(df_tx: pd.DataFrame,
                         val_col="valor_transacao",
                         dt_col="data_transacao",
                         ref_col="data_referencia",
-                        usar_M_1=True) -> pd.DataFrame:
+                        usar_M_1=True,
+                        janelas=None,
+                        vetorizado=True) -> pd.DataFrame:
     """
     Gera variáveis de VALOR a partir da base de transações,
     com referência na base de inadimplência.
@@ -21,6 +27,8 @@ def features_valor_flex(df_tx: pd.DataFrame,
     Variáveis criadas:
     -----------------
     - vlr_trans_Xm : soma do valor transacionado no período (X = 1,3,6,9,12,24,ever)
+                     O argumento `janelas` aceita outro conjunto de meses e
+                     comparações (ver features.janelas.especificar_janelas).
     - vlr_trans_ult : valor da última transação até o cutoff
     - vlr_trans_max : maior valor de transação até o cutoff
     - vlr_trans_min : menor valor de transação até o cutoff
@@ -31,13 +39,30 @@ def features_valor_flex(df_tx: pd.DataFrame,
     - flag_completo_Xm : indica se a janela X meses está completamente observada (1/0)
     - perc_janela_coberta_Xm : proporção de dias observados na janela X meses
     - flag_cliente_novo : 1 se a primeira transação ocorreu nos últimos 6 meses
+
+    Execução:
+    - vetorizado=True (padrão): somas por janela como diferença de somas acumuladas
+      por cliente, última/máxima/mínima por posição e acumulados (running max/min)
+      no vetor ordenado, completude e cobertura em expressões fechadas por coluna.
+    - vetorizado=False: implementação original linha a linha (referência).
+    - df_tx pode ser um IndiceTransacoes já construído (features.indice_transacoes),
+      evitando reordenar as transações a cada chamada (somente vetorizado=True).
+      Também aceita um CuboMensal (features.cubo_mensal) quando os cutoffs caem no
+      último dia do mês.
     """
 
+    espec = especificar_janelas(janelas)
+    janelas, comparacoes = espec["janelas"], espec["comparacoes"]
+
+    if vetorizado:
+        contexto = preparar_contexto(df_tx, df_inad, espec, id_col, dt_col,
+                                     ref_col, usar_M_1, val_col)
+        return pd.DataFrame({id_col: df_inad[id_col].to_numpy(),
+                             ref_col: df_inad[ref_col].to_numpy(),
+                             **colunas_valor(contexto)})
+
+    exigir_dataframe(df_tx, "features_valor_flex")
     resultados = []
-    janelas = {"1m": 1, "3m": 3, "6m": 6, "9m": 9,
-               "12m": 12, "24m": 24, "ever": None}
-    comparacoes = [("1m", "3m"), ("3m", "6m"), ("6m", "9m"),
-                   ("9m", "12m"), ("12m", "24m"), ("24m", "ever")]
 
     clientes_com_tx = set(df_tx[id_col].unique())
     # primeira transação de cada cliente
@@ -135,3 +160,54 @@ def features_valor_flex(df_tx: pd.DataFrame,
         resultados.append({id_col: cid, ref_col: ref_date, **feats})
 
     return pd.DataFrame(resultados)
+
+
+def colunas_valor(contexto: dict) -> dict:
+    """
+    Colunas de features_valor_flex a partir de um contexto de janelas já resolvido
+    (ver features.janelas.preparar_contexto com val_col, ou contexto_cubo), com a
+    mesma saída da versão linha a linha.
+    """
+    janelas, comparacoes = contexto["janelas"], contexto["comparacoes"]
+    cutoff = contexto["cutoff"]
+    sem_tx = contexto["sem_tx"]
+
+    primeira, tem_primeira = contexto["primeira_cliente"], contexto["tem_primeira"]
+
+    feats = {}
+
+    # Totais por janela (meses fechados), completude e cobertura
+    vlr = contexto["soma"]
+    for label, meses in janelas.items():
+        feats[f"vlr_trans_{label}"] = aplicar_nan(vlr[label], sem_tx)
+        if meses is None:
+            continue
+
+        start = dias_inicio_janela(cutoff, meses)
+        feats[f"flag_completo_{label}"] = (
+            tem_primeira & (primeira <= start)).astype(np.int64)
+
+        dias_esperados = cutoff - start + 1
+        dias_com_historico = np.maximum(cutoff - np.maximum(primeira, start) + 1, 0)
+        perc = np.round(dias_com_historico / dias_esperados, 3)
+        perc = np.where(tem_primeira, perc, np.nan)
+        feats[f"perc_janela_coberta_{label}"] = np.where(sem_tx, 0.0, perc)
+
+    # Última, máxima e mínima até o cutoff
+    extremos = contexto["extremos"]
+    feats["vlr_trans_ult"] = extremos["ult"]
+    feats["vlr_trans_max"] = extremos["max"]
+    feats["vlr_trans_min"] = extremos["min"]
+
+    # Comparações vizinhas (regra unificada)
+    for a, b in comparacoes:
+        feats[f"comp_vlr_{a}_vs_{b}"] = aplicar_nan(
+            razao_vizinha(vlr[a], vlr[b]), sem_tx)
+        feats[f"delta_vlr_{a}_vs_{b}"] = aplicar_nan(vlr[a] - vlr[b], sem_tx)
+
+    # Flag cliente novo (entrou nos últimos 6 meses em relação à ref_date)
+    limite_novo = para_dias(contexto["ref_dates"] - pd.DateOffset(months=6))
+    novo = (tem_primeira & (primeira > limite_novo)).astype(np.int64)
+    feats["flag_cliente_novo"] = aplicar_nan(novo, sem_tx)
+
+    return feats
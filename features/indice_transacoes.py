@@ -0,0 +1,168 @@
+import pandas as pd
+import numpy as np
+
+# Deslocamentos usados para compor a chave (cliente, dia) em um único int64.
+# Dias desde 1970 cabem com folga em +/- 2**20, então a chave fica ordenada
+# primeiro por cliente e depois por dia.
+_DESLOC_DIA = 2 ** 20
+_BASE_CHAVE = 2 ** 21
+
+
+def para_dias(datas) -> np.ndarray:
+    """
+    Converte datas (Series/array datetime64) em inteiros de dias desde 1970-01-01.
+    """
+    valores = np.asarray(datas, dtype="datetime64[ns]")
+    return valores.astype("datetime64[D]").astype(np.int64)
+
+
+def valores_em(vetor: np.ndarray, pos: np.ndarray, padrao) -> np.ndarray:
+    """
+    Elementos de `vetor` nas posições `pos`; posições fora do vetor (inclusive
+    -1, usado para janelas vazias) retornam `padrao`. Não copia o vetor, então
+    o custo depende só de len(pos).
+    """
+    pos = np.asarray(pos)
+    if len(vetor) == 0:
+        return np.full(pos.shape, padrao)
+    fora = (pos < 0) | (pos >= len(vetor))
+    return np.where(fora, padrao, vetor[np.clip(pos, 0, len(vetor) - 1)])
+
+
+class IndiceTransacoes:
+    """
+    Índice de transações por cliente no formato CSR (compressed sparse row),
+    construído uma única vez a partir da saída de `preprocessar_transacoes`.
+
+    As transações com data válida são ordenadas (de forma estável) por
+    (cliente, data) e guardadas em vetores NumPy compactos:
+
+    - clientes : pd.Index com todos os clientes de df_tx (inclusive os que só
+                 têm datas inválidas); a posição é o código inteiro do cliente.
+    - offsets  : int64 (n_clientes + 1); as transações do cliente c ocupam as
+                 posições [offsets[c], offsets[c+1]).
+    - codigos  : int32, código do cliente de cada transação ordenada.
+    - dias     : int32, dias desde 1970-01-01 de cada transação ordenada.
+    - valores  : float64, valor de cada transação ordenada (None se val_col ausente).
+    - ordem    : int64, posição original (em df_tx) de cada transação ordenada.
+
+    Pode ser passado no lugar de df_tx para as funções de features transacionais,
+    evitando reordenar as transações a cada chamada.
+    """
+
+    def __init__(self,
+                 df_tx: pd.DataFrame,
+                 id_col: str = "id_cliente",
+                 dt_col: str = "data_transacao",
+                 val_col: str = "valor_transacao"):
+        self.id_col = id_col
+        self.dt_col = dt_col
+        self.val_col = val_col if val_col in df_tx.columns else None
+
+        codigos, clientes = pd.factorize(df_tx[id_col], sort=True)
+        datas = df_tx[dt_col]
+        validas = datas.notna().to_numpy() & (codigos >= 0)
+
+        pos_validas = np.flatnonzero(validas)
+        codigos = codigos[validas]
+        dias = para_dias(datas.to_numpy()[validas])
+
+        ordem_local = np.lexsort((dias, codigos))
+
+        self.clientes = pd.Index(clientes)
+        self.codigos = codigos[ordem_local].astype(np.int32)
+        self.dias = dias[ordem_local].astype(np.int32)
+        self.ordem = pos_validas[ordem_local]
+        self.offsets = np.zeros(len(self.clientes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.codigos, minlength=len(self.clientes)),
+                  out=self.offsets[1:])
+
+        if self.val_col is not None:
+            valores = pd.to_numeric(df_tx[val_col], errors="coerce")
+            self.valores = valores.to_numpy(dtype=float)[self.ordem]
+        else:
+            self.valores = None
+
+        self._chave = (self.codigos.astype(np.int64) * _BASE_CHAVE
+                       + self.dias + _DESLOC_DIA)
+        self._acumulados = None
+
+    def __len__(self) -> int:
+        return len(self.dias)
+
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelos vetores do índice (bytes)."""
+        vetores = [self.codigos, self.dias, self.ordem, self.offsets, self._chave]
+        if self.valores is not None:
+            vetores.append(self.valores)
+        return sum(v.nbytes for v in vetores)
+
+    def codificar(self, ids) -> np.ndarray:
+        """
+        Código de cada id no índice (-1 se o cliente não possui nenhuma transação).
+        """
+        return self.clientes.get_indexer(pd.Index(ids))
+
+    def posicoes(self, codigos: np.ndarray, dias: np.ndarray, lado: str) -> np.ndarray:
+        """
+        Posição, no vetor ordenado, de cada par (cliente, dia).
+
+        - lado="left" : primeira transação do cliente com data >= dia.
+        - lado="right": primeira transação do cliente com data > dia.
+
+        Códigos negativos (cliente sem transações) devem ser tratados pelo chamador.
+        """
+        alvo = np.maximum(codigos, 0).astype(np.int64) * _BASE_CHAVE + dias + _DESLOC_DIA
+        return np.searchsorted(self._chave, alvo, side=lado)
+
+    def inicio_cliente(self, codigos: np.ndarray) -> np.ndarray:
+        """Posição da primeira transação válida de cada cliente."""
+        return self.offsets[np.maximum(codigos, 0)]
+
+    def fim_cliente(self, codigos: np.ndarray) -> np.ndarray:
+        """Posição logo após a última transação válida de cada cliente."""
+        return self.offsets[np.maximum(codigos, 0) + 1]
+
+    def dias_em(self, pos: np.ndarray) -> np.ndarray:
+        """
+        Dia da transação em cada posição do vetor ordenado. Posições fora do vetor
+        (janelas vazias) retornam um valor qualquer e devem ser mascaradas pelo chamador.
+        """
+        return valores_em(self.dias, pos, 0).astype(np.int64)
+
+    def primeira_data(self, codigos: np.ndarray):
+        """
+        Dia da primeira transação (com data válida) de cada cliente, considerando
+        todo o histórico, e a máscara de clientes que possuem essa data.
+        """
+        valida = (codigos >= 0) & (self.fim_cliente(codigos) > self.inicio_cliente(codigos))
+        return self.dias_em(self.inicio_cliente(codigos)), valida
+
+    @property
+    def acumulados(self) -> dict:
+        """
+        Acumulados por cliente ao longo do vetor ordenado (reiniciam a cada
+        cliente), calculados uma única vez e reaproveitados entre chamadas:
+        - soma : soma acumulada dos valores (nulos contam como 0).
+        - max  : maior valor até a posição (NaN enquanto só houver nulos).
+        - min  : menor valor até a posição (NaN enquanto só houver nulos).
+        """
+        if self.valores is None:
+            raise ValueError(
+                "IndiceTransacoes construído sem coluna de valor (val_col).")
+
+        if self._acumulados is None:
+            valores = pd.Series(self.valores)
+            grupos = self.codigos
+
+            soma = valores.fillna(0).groupby(grupos).cumsum().to_numpy()
+            maximo = valores.fillna(-np.inf).groupby(grupos).cummax().to_numpy()
+            minimo = valores.fillna(np.inf).groupby(grupos).cummin().to_numpy()
+
+            self._acumulados = {
+                "soma": soma,
+                "max": np.where(np.isinf(maximo), np.nan, maximo),
+                "min": np.where(np.isinf(minimo), np.nan, minimo),
+            }
+        return self._acumulados
@@ -0,0 +1,331 @@
+import pandas as pd
+import numpy as np
+
+from features.indice_transacoes import IndiceTransacoes, valores_em
+from features.cubo_mensal import CuboMensal
+
+# Janelas (em meses fechados) e comparações vizinhas usadas por padrão em todas
+# as famílias de features transacionais
+JANELAS_PADRAO = {"1m": 1, "3m": 3, "6m": 6, "9m": 9,
+                  "12m": 12, "24m": 24, "ever": None}
+COMPARACOES_PADRAO = [("1m", "3m"), ("3m", "6m"), ("6m", "9m"),
+                      ("9m", "12m"), ("12m", "24m"), ("24m", "ever")]
+# janelas com pct_qtde_trans_Xm no conjunto padrão (historicamente sem 9m)
+PCT_PADRAO = ["1m", "3m", "6m", "12m", "24m"]
+
+
+def especificar_janelas(janelas=None, comparacoes=None) -> dict:
+    """
+    Monta a especificação de janelas compartilhada por gerar_abt e pelas
+    famílias de features transacionais.
+
+    Parâmetros
+    ----------
+    janelas : None, lista ou dict
+        - None: janelas padrão (1m, 3m, 6m, 9m, 12m, 24m, ever).
+        - lista de meses, ex.: [1, 3, 6, 12, 18, 24, 36] → labels "1m", "3m", ...
+        - dict label -> meses (None para "ever").
+        A janela "ever" é sempre incluída (ao final), pois é a base das flags,
+        dos percentuais e da completude.
+        Uma especificação já montada (retorno desta função) é devolvida como está.
+    comparacoes : None ou lista de pares (label_a, label_b)
+        - None: pares vizinhos na ordem crescente de meses, terminando em "ever".
+
+    Retorna
+    -------
+    dict com:
+    - janelas     : dict label -> meses (None para ever)
+    - comparacoes : lista de pares de labels comparados (comp_* e delta_*)
+    - pct         : labels com pct_qtde_trans_Xm
+    """
+    if isinstance(janelas, dict) and "janelas" in janelas:
+        return janelas
+
+    if janelas is None:
+        espec_janelas = dict(JANELAS_PADRAO)
+        pct = list(PCT_PADRAO)
+        if comparacoes is None:
+            comparacoes = list(COMPARACOES_PADRAO)
+    else:
+        if not isinstance(janelas, dict):
+            janelas = {("ever" if m is None else f"{m}m"): m for m in janelas}
+        finitas = {label: meses for label, meses in janelas.items() if meses is not None}
+        for label, meses in finitas.items():
+            if int(meses) != meses or meses < 1:
+                raise ValueError(f"janela inválida {label!r}: {meses!r} (use meses >= 1).")
+        espec_janelas = dict(sorted(finitas.items(), key=lambda item: item[1]))
+        espec_janelas["ever"] = None
+        pct = [label for label, meses in espec_janelas.items() if meses is not None]
+
+    labels = list(espec_janelas.keys())
+    if comparacoes is None:
+        comparacoes = list(zip(labels[:-1], labels[1:]))
+    for a, b in comparacoes:
+        if a not in espec_janelas or b not in espec_janelas:
+            raise ValueError(f"comparação ({a!r}, {b!r}) usa janela inexistente.")
+
+    return {"janelas": espec_janelas, "comparacoes": list(comparacoes), "pct": pct}
+
+
+def dias_cutoff(ref_dates, usar_M_1: bool = True) -> np.ndarray:
+    """
+    Calcula o cutoff (em dias) de cada data de referência.
+
+    - usar_M_1=True : último dia do mês anterior (M-1), equivalente a
+                      ref_date - pd.offsets.MonthEnd(1).
+    - usar_M_1=False: a própria data de referência (M).
+    """
+    valores = np.asarray(ref_dates, dtype="datetime64[ns]")
+    if usar_M_1:
+        inicio_mes = valores.astype("datetime64[M]").astype("datetime64[D]")
+        return (inicio_mes - np.timedelta64(1, "D")).astype(np.int64)
+    return valores.astype("datetime64[D]").astype(np.int64)
+
+
+def dias_inicio_janela(cutoff_dias: np.ndarray, meses: int) -> np.ndarray:
+    """
+    Início (em dias) da janela de `meses` meses fechados terminando no cutoff.
+
+    Equivalente a (cutoff - pd.DateOffset(months=meses-1)).replace(day=1).
+    """
+    mes_cutoff = cutoff_dias.astype("datetime64[D]").astype("datetime64[M]")
+    inicio = mes_cutoff - np.timedelta64(meses - 1, "M")
+    return inicio.astype("datetime64[D]").astype(np.int64)
+
+
+def obter_indice(df_tx,
+                 id_col: str = "id_cliente",
+                 dt_col: str = "data_transacao",
+                 val_col: str = None) -> IndiceTransacoes:
+    """
+    Aceita tanto um DataFrame de transações quanto um IndiceTransacoes já
+    construído; no primeiro caso, constrói o índice.
+    """
+    if isinstance(df_tx, IndiceTransacoes):
+        if val_col is not None and df_tx.valores is None:
+            raise ValueError(
+                "IndiceTransacoes construído sem coluna de valor (val_col).")
+        return df_tx
+    return IndiceTransacoes(df_tx, id_col, dt_col, val_col)
+
+
+def limites_janelas(indice: IndiceTransacoes,
+                    codigos: np.ndarray,
+                    cutoff_dias: np.ndarray,
+                    janelas: dict):
+    """
+    Resolve, para todas as linhas de uma vez, os limites de cada janela no vetor
+    de transações ordenado.
+
+    Retorna (inicios, fim):
+    - inicios : dict label -> posição da primeira transação da janela.
+    - fim     : posição logo após a última transação com data <= cutoff.
+
+    A quantidade de transações da janela é `fim - inicios[label]` (diferença
+    entre as contagens acumuladas do cliente nos dois limites).
+    """
+    fim = indice.posicoes(codigos, cutoff_dias, "right")
+    inicios = {}
+    for label, meses in janelas.items():
+        if meses is None:  # ever = todo histórico até o cutoff
+            inicios[label] = indice.inicio_cliente(codigos)
+        else:
+            inicio = dias_inicio_janela(cutoff_dias, meses)
+            inicios[label] = indice.posicoes(codigos, inicio, "left")
+    return inicios, fim
+
+
+def soma_janela(acumulados: dict,
+                inicio_cliente: np.ndarray,
+                lo: np.ndarray,
+                hi: np.ndarray) -> np.ndarray:
+    """
+    Soma dos valores nas posições [lo, hi) como diferença das somas acumuladas
+    do cliente nos dois limites.
+    """
+    soma = acumulados["soma"]
+    antes_hi = np.where(hi > inicio_cliente, valores_em(soma, hi - 1, 0.0), 0.0)
+    antes_lo = np.where(lo > inicio_cliente, valores_em(soma, lo - 1, 0.0), 0.0)
+    return np.where(hi > lo, antes_hi - antes_lo, 0.0)
+
+
+def extremos_ate_cutoff(indice: IndiceTransacoes,
+                        codigos: np.ndarray,
+                        inicio_cliente: np.ndarray,
+                        fim: np.ndarray) -> dict:
+    """
+    Valores das transações de cada cliente até o cutoff (NaN sem histórico):
+    - ult : valor da última transação; em empates na data mais recente vale a
+            primeira na ordem de df_tx (como idxmax).
+    - max / min : maior e menor valor (running max/min do índice).
+    """
+    tem_hist = (codigos >= 0) & (fim > inicio_cliente)
+    ult = fim - 1
+    pos_ult = indice.posicoes(codigos, indice.dias_em(ult), "left")
+    acumulados = indice.acumulados
+    return {
+        "ult": np.where(tem_hist, valores_em(indice.valores, pos_ult, np.nan), np.nan),
+        "max": np.where(tem_hist, valores_em(acumulados["max"], ult, np.nan), np.nan),
+        "min": np.where(tem_hist, valores_em(acumulados["min"], ult, np.nan), np.nan),
+    }
+
+
+def preparar_contexto(df_tx,
+                      df_inad: pd.DataFrame,
+                      janelas=None,
+                      id_col: str = "id_cliente",
+                      dt_col: str = "data_transacao",
+                      ref_col: str = "data_referencia",
+                      usar_M_1: bool = True,
+                      val_col: str = None) -> dict:
+    """
+    Resolve uma única vez tudo o que as famílias de features transacionais
+    compartilham: o índice ordenado de transações, o código do cliente e o
+    cutoff de cada linha de df_inad e os limites de todas as janelas.
+
+    df_tx pode ser o DataFrame de transações, um IndiceTransacoes ou um
+    CuboMensal (ver contexto_cubo). janelas aceita qualquer entrada de
+    especificar_janelas.
+
+    Além das posições no vetor ordenado (inicios/fim), o contexto traz os
+    agregados por janela consumidos pelas famílias de features:
+    - qtde     : dict label -> quantidade de transações na janela.
+    - soma     : dict label -> soma dos valores na janela (se val_col for informado).
+    - primeira : dict label -> dia da primeira transação da janela.
+    - ultima   : dia da última transação até o cutoff.
+    Com val_col, também os insumos da família de valor:
+    - primeira_cliente / tem_primeira : dia da primeira transação do cliente em
+      todo o histórico e a máscara de clientes que a possuem.
+    - extremos : dict ult/max/min com os valores até o cutoff.
+    """
+    if isinstance(df_tx, CuboMensal):
+        return contexto_cubo(df_tx, df_inad, janelas, id_col, ref_col, usar_M_1)
+
+    espec = especificar_janelas(janelas)
+    janelas = espec["janelas"]
+
+    indice = obter_indice(df_tx, id_col, dt_col, val_col)
+    codigos = indice.codificar(df_inad[id_col])
+    cutoff = dias_cutoff(df_inad[ref_col], usar_M_1)
+    inicios, fim = limites_janelas(indice, codigos, cutoff, janelas)
+
+    contexto = {
+        **espec,
+        "indice": indice,
+        "codigos": codigos,
+        "sem_tx": codigos < 0,
+        "ref_dates": df_inad[ref_col],
+        "cutoff": cutoff,
+        "inicios": inicios,
+        "fim": fim,
+        "qtde": {label: fim - inicios[label] for label in janelas.keys()},
+        "primeira": {label: indice.dias_em(inicios[label]) for label in janelas.keys()},
+        "ultima": indice.dias_em(fim - 1),
+    }
+    # somas por janela só quando pedidas (val_col), pois exigem os acumulados do índice
+    if val_col is not None and indice.valores is not None:
+        contexto["soma"] = {
+            label: soma_janela(indice.acumulados, inicios["ever"], inicios[label], fim)
+            for label in janelas.keys()
+        }
+        contexto["primeira_cliente"], contexto["tem_primeira"] = indice.primeira_data(codigos)
+        contexto["extremos"] = extremos_ate_cutoff(indice, codigos, inicios["ever"], fim)
+    return contexto
+
+
+def contexto_cubo(cubo: CuboMensal,
+                  df_inad: pd.DataFrame,
+                  janelas=None,
+                  id_col: str = "id_cliente",
+                  ref_col: str = "data_referencia",
+                  usar_M_1: bool = True) -> dict:
+    """
+    Contexto de janelas a partir do cubo cliente x mês: cada agregado da janela
+    é uma diferença de somas acumuladas ao longo do eixo dos meses.
+
+    Exige cutoffs no último dia do mês (sempre verdade com data_referencia
+    gerada por preprocessar_inadimplencia), pois o cubo não enxerga frações de mês.
+    Traz as mesmas chaves de preparar_contexto com val_col (todas as famílias,
+    inclusive a de valor, podem ser calculadas sobre o cubo).
+    """
+    espec = especificar_janelas(janelas)
+    janelas = espec["janelas"]
+
+    codigos = cubo.codificar(df_inad[id_col])
+    cutoff = dias_cutoff(df_inad[ref_col], usar_M_1)
+
+    proximo_dia = (cutoff + 1).astype("datetime64[D]")
+    if (proximo_dia != proximo_dia.astype("datetime64[M]")).any():
+        raise ValueError(
+            "contexto_cubo: o cubo mensal exige cutoff no último dia do mês.")
+
+    # janela de meses [lo, hi) no eixo do cubo
+    n_meses = len(cubo.meses)
+    mes_cutoff = cubo.posicao_mes(cutoff)
+    hi = np.clip(mes_cutoff + 1, 0, n_meses)
+
+    qtde, soma, primeira = {}, {}, {}
+    for label, meses in janelas.items():
+        if meses is None:  # ever = todo histórico até o cutoff
+            lo = np.zeros_like(hi)
+        else:
+            lo = np.clip(mes_cutoff + 1 - meses, 0, n_meses)
+        janela = cubo.janela(codigos, lo, hi)
+        qtde[label] = janela["qtde"]
+        soma[label] = janela["soma"]
+        primeira[label] = janela["primeiro_dia"]
+
+    # primeira transação em todo o histórico (inclusive depois do cutoff)
+    historico = cubo.janela(codigos, np.zeros_like(hi), np.full_like(hi, n_meses))
+
+    return {
+        **espec,
+        "codigos": codigos,
+        "sem_tx": codigos < 0,
+        "ref_dates": df_inad[ref_col],
+        "cutoff": cutoff,
+        "qtde": qtde,
+        "soma": soma,
+        "primeira": primeira,
+        "ultima": cubo.ultimo_dia_ate(codigos, hi),
+        "primeira_cliente": historico["primeiro_dia"],
+        "tem_primeira": historico["qtde"] > 0,
+        "extremos": cubo.extremos_ate(codigos, hi),
+    }
+
+
+def exigir_dataframe(df_tx, funcao: str):
+    """
+    As implementações linha a linha (vetorizado=False) só operam sobre o
+    DataFrame de transações.
+    """
+    if isinstance(df_tx, IndiceTransacoes):
+        raise ValueError(
+            f"{funcao}: vetorizado=False exige o DataFrame de transações, "
+            "não um IndiceTransacoes.")
+
+
+def razao_vizinha(v1: np.ndarray, v2: np.ndarray) -> np.ndarray:
+    """
+    Razão entre janelas vizinhas com a regra unificada dos módulos de features:
+    * NaN → ambos zero
+    * -1  → denominador zero e numerador > 0 (início de atividade)
+    * caso contrário, v1/v2 arredondado em 3 casas.
+    """
+    v1 = np.asarray(v1, dtype=float)
+    v2 = np.asarray(v2, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        comp = np.round(v1 / v2, 3)
+    comp = np.where(v2 == 0, -1.0, comp)
+    return np.where((v1 == 0) & (v2 == 0), np.nan, comp)
+
+
+def aplicar_nan(valores: np.ndarray, mascara: np.ndarray) -> np.ndarray:
+    """
+    Substitui por NaN as posições de `mascara`. Mantém o dtype original
+    quando não há nada a substituir, reproduzindo o comportamento do
+    DataFrame montado linha a linha.
+    """
+    if not mascara.any():
+        return valores
+    return np.where(mascara, np.nan, valores)
@@ -0,0 +1,83 @@
+import re
+
+from features.janelas import especificar_janelas
+
+# Famílias transacionais, na ordem em que aparecem na ABT
+FAMILIAS_TRANSACIONAIS = ["valor", "quantidade", "tempo", "flags"]
+
+# Padrões dos nomes de colunas de cada família. {L} é substituído pelos labels
+# de janela; os grupos nomeados indicam do que a coluna depende:
+# a/b = janelas (b: comparação a_vs_b), p = janela com percentual (pct).
+_PADROES = [
+    ("valor", r"(?:vlr_trans|flag_completo|perc_janela_coberta)_(?P<a>{L})"),
+    ("valor", r"vlr_trans_(?:ult|max|min)|flag_cliente_novo"),
+    ("valor", r"(?:comp|delta)_vlr_(?P<a>{L})_vs_(?P<b>{L})"),
+    ("quantidade", r"qtde_trans_(?P<a>{L})"),
+    ("quantidade", r"pct_qtde_trans_(?P<p>{L})"),
+    ("quantidade", r"(?:comp|delta)_qtde_(?P<a>{L})_vs_(?P<b>{L})"),
+    ("tempo", r"tempo_(?:desde_primeira|desde_ultima|atividade)_(?P<a>{L})"),
+    ("flags", r"flag_nunca_transacionou|flag_transacao_(?P<a>{L})"),
+]
+
+
+def resolver_colunas(colunas, janelas=None) -> dict:
+    """
+    Resolve do que um subconjunto de colunas da ABT depende, para calcular
+    apenas o necessário.
+
+    Parâmetros
+    ----------
+    colunas : lista de colunas desejadas (ex.: remover_vars(...)["final"]).
+    janelas : especificação completa de janelas (a mesma da ABT de pesquisa;
+              ver especificar_janelas).
+
+    Retorna
+    -------
+    dict com:
+    - familias : famílias transacionais necessárias (ordem da ABT).
+    - espec    : especificação reduzida: só as janelas, comparações e
+                 percentuais usados (a janela "ever" é sempre mantida, pois é
+                 a base do histórico do cliente).
+    - outras   : colunas que não são transacionais (cadastrais ou de df_inad).
+
+    Comparações e percentuais fora da especificação completa não são
+    reconhecidos (ficam em `outras`), como na ABT de pesquisa.
+    """
+    espec = especificar_janelas(janelas)
+    labels = "|".join(re.escape(label) for label in espec["janelas"])
+    padroes = [(familia, re.compile(padrao.replace("{L}", f"(?:{labels})")))
+               for familia, padrao in _PADROES]
+
+    familias, usadas, pares, pct, outras = set(), set(), set(), set(), []
+    for coluna in colunas:
+        for familia, padrao in padroes:
+            casamento = padrao.fullmatch(coluna)
+            if casamento is None:
+                continue
+            grupos = casamento.groupdict()
+            if grupos.get("b") is not None:
+                if (grupos["a"], grupos["b"]) not in espec["comparacoes"]:
+                    continue
+                pares.add((grupos["a"], grupos["b"]))
+            if grupos.get("p") is not None:
+                if grupos["p"] not in espec["pct"]:
+                    continue
+                pct.add(grupos["p"])
+            usadas.update(v for v in grupos.values() if v is not None)
+            familias.add(familia)
+            break
+        else:
+            outras.append(coluna)
+
+    reduzida = {
+        "janelas": {label: meses for label, meses in espec["janelas"].items()
+                    if label in usadas or meses is None},
+        "comparacoes": [par for par in espec["comparacoes"] if par in pares],
+        "pct": [label for label in espec["pct"] if label in pct],
+    }
+
+    return {
+        "familias": [f for f in FAMILIAS_TRANSACIONAIS if f in familias],
+        "espec": reduzida,
+        "outras": outras,
+    }
@@ -0,0 +1,139 @@
+import os
+
+import pandas as pd
+import numpy as np
+
+from features.janelas import dias_cutoff
+from features.indice_transacoes import para_dias
+from pipeline.criar_abt import (CHAVES_ABT, montar_abt, gravar_abt_particionada,
+                                ler_abt_particionada)
+
+
+def linhas_afetadas(df_inad, tx_novas, df_tx,
+                    id_col="id_cliente",
+                    dt_col="data_transacao",
+                    ref_col="data_referencia",
+                    usar_M_1=True) -> np.ndarray:
+    """
+    Máscara das linhas de df_inad cujas features mudam com a chegada de
+    `tx_novas` (df_tx é a base completa, já com tx_novas):
+
+    - uma transação do cliente c no dia d entra em todas as janelas (no
+      mínimo na "ever") das safras de c com cutoff >= d. Transações sem data
+      válida atingem todas as safras do cliente;
+    - se c não tinha nenhuma transação, ou se a primeira transação de c
+      mudou, todas as safras de c mudam, inclusive as anteriores a d: saem da
+      condição de "sem transação" (features NaN) e flag_cliente_novo,
+      flag_completo_Xm e perc_janela_coberta_Xm usam a primeira transação do
+      cliente em todo o histórico.
+    """
+    if tx_novas.empty:
+        return np.zeros(len(df_inad), dtype=bool)
+
+    dias = pd.Series(para_dias(tx_novas[dt_col].to_numpy()), index=tx_novas.index)
+    dias = dias.where(tx_novas[dt_col].notna(), np.iinfo(np.int64).min)
+    primeira_dia = dias.groupby(tx_novas[id_col]).min()
+
+    # clientes sem transações anteriores: todas as suas transações são novas
+    n_total = df_tx[id_col].value_counts()
+    n_novas = tx_novas[id_col].value_counts()
+    sem_anteriores = n_novas.index[n_novas >= n_total.reindex(n_novas.index, fill_value=0)]
+
+    # primeira transação alterada: todas as transações do dia mais antigo são novas
+    primeira = df_tx.groupby(id_col)[dt_col].min()
+
+    def na_primeira(df):
+        df = df[df[dt_col].notna()]
+        return (df[dt_col] == df[id_col].map(primeira)).groupby(df[id_col]).sum()
+
+    novas_na_primeira = na_primeira(tx_novas)
+    total_na_primeira = na_primeira(df_tx).reindex(novas_na_primeira.index)
+    primeira_alterada = novas_na_primeira.index[novas_na_primeira == total_na_primeira]
+
+    todas_as_safras = sem_anteriores.union(primeira_alterada)
+    primeira_dia[primeira_dia.index.isin(todas_as_safras)] = np.iinfo(np.int64).min
+
+    dia_minimo = df_inad[id_col].map(primeira_dia)
+    cutoff = dias_cutoff(df_inad[ref_col], usar_M_1)
+
+    return (dia_minimo.notna() & (cutoff >= dia_minimo.fillna(0))).to_numpy()
+
+
+def atualizar_abt(df_clientes, df_inad, df_tx, diretorio, tx_novas=None,
+                  usar_M_1=True, fundido=True, janelas=None, cache=None,
+                  particao="mes_safra"):
+    """
+    Atualização incremental da ABT persistida em `diretorio` (dataset Parquet
+    particionado por safra, ver gravar_abt_particionada).
+
+    São recalculadas apenas:
+    - as linhas de df_inad cujo par (id_cliente, data_referencia) ainda não
+      existe na ABT gravada (ex.: nova mes_safra);
+    - as linhas já existentes atingidas por transações de `tx_novas`
+      (transações chegadas desde a última execução, inclusive atrasadas).
+
+    As features são calculadas só sobre os clientes dessas linhas (transações
+    e cadastro filtrados), e apenas as partições envolvidas são regravadas;
+    o custo cresce com o volume novo, não com o histórico.
+
+    Parâmetros
+    ----------
+    df_clientes, df_inad, df_tx : bases pré-processadas completas (df_tx já
+        inclui tx_novas).
+    diretorio : str, dataset da ABT. Se não existir, é criado com a ABT completa.
+    tx_novas : DataFrame opcional com as transações novas. None considera que
+        não houve transações atrasadas (só pares novos são calculados).
+    usar_M_1, fundido, janelas, cache : como em gerar_abt.
+
+    Retorna
+    -------
+    DataFrame com as linhas recalculadas (vazio se nada mudou).
+
+    Observação: alterações cadastrais em df_clientes não são detectadas; nesse
+    caso, refaça a ABT completa.
+    """
+    id_col = CHAVES_ABT[0]
+
+    if os.path.exists(os.path.join(diretorio, "_colunas.json")):
+        existentes = ler_abt_particionada(diretorio, particao, colunas=CHAVES_ABT)
+        chaves_existentes = pd.MultiIndex.from_frame(existentes[CHAVES_ABT])
+        ja_existe = pd.MultiIndex.from_frame(df_inad[CHAVES_ABT]).isin(chaves_existentes)
+    else:
+        ja_existe = np.zeros(len(df_inad), dtype=bool)
+
+    recalcular = ~ja_existe
+    if tx_novas is not None:
+        recalcular |= ja_existe & linhas_afetadas(df_inad, tx_novas, df_tx,
+                                                  usar_M_1=usar_M_1)
+
+    if not recalcular.any():
+        return df_inad.iloc[:0]
+
+    inad_recalc = df_inad[recalcular]
+    clientes = inad_recalc[id_col].unique()
+
+    novas = montar_abt(df_clientes[df_clientes[id_col].isin(clientes)],
+                       inad_recalc,
+                       df_tx[df_tx[id_col].isin(clientes)],
+                       usar_M_1=usar_M_1, fundido=fundido, janelas=janelas,
+                       cache=cache)
+
+    # Regrava só as partições envolvidas: linhas antigas não recalculadas +
+    # linhas novas, na ordem de df_inad
+    safras = list(novas[particao].astype(str).unique())
+    if ja_existe.any():
+        antigas = ler_abt_particionada(diretorio, particao, valores=safras)
+        recalculadas = pd.MultiIndex.from_frame(novas[CHAVES_ABT])
+        antigas = antigas[~pd.MultiIndex.from_frame(antigas[CHAVES_ABT]).isin(recalculadas)]
+        particoes = pd.concat([antigas, novas], ignore_index=True)
+    else:
+        particoes = novas
+
+    ordem_inad = pd.MultiIndex.from_frame(df_inad[CHAVES_ABT])
+    ordem_inad = ordem_inad[~ordem_inad.duplicated()]
+    posicao = ordem_inad.get_indexer(pd.MultiIndex.from_frame(particoes[CHAVES_ABT]))
+    particoes = particoes.iloc[np.argsort(posicao, kind="stable")]
+
+    gravar_abt_particionada(particoes, diretorio, particao)
+
+    return novas
@@ -0,0 +1,349 @@
+import os
+import json
+import time
+import shutil
+import warnings
+import platform
+import argparse
+import tempfile
+import subprocess
+
+import pandas as pd
+import numpy as np
+
+from pipeline.carregar_dados import carregar_dados
+from pipeline.preprocess import (preprocessar_clientes, preprocessar_inadimplencia,
+                                 preprocessar_transacoes)
+from pipeline.criar_abt import gerar_abt
+from pipeline.dados_sinteticos import gerar_dados_sinteticos
+from pipeline.instrumentacao import zerar_pico_rss, pico_rss_mb
+from features.indice_transacoes import IndiceTransacoes
+from features.features_clientes import features_clientes
+from features.features_valor import features_valor_flex
+from features.features_quantidade import features_quantidade_flex
+from features.features_tempo import features_tempo_flex
+from features.features_flags import features_flags_flex
+from features.features_transacionais import features_transacionais
+
+_RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTORICO_PADRAO = os.path.join(_RAIZ, "data", "benchmarks", "historico.json")
+DADOS_PADRAO = os.path.join(_RAIZ, "data", "synthetic")
+
+ESCALAS_PADRAO = [10_000, 100_000, 1_000_000]
+
+# Etapas na ordem de execução; as de utils dependem das bibliotecas de
+# modelagem (feature_engine etc.) e são marcadas como indisponíveis sem elas
+ETAPAS = [
+    "carregar_dados", "carregar_dados_cache",
+    "preprocessar_clientes", "preprocessar_inadimplencia", "preprocessar_transacoes",
+    "indice_transacoes",
+    "features_clientes", "features_valor", "features_quantidade", "features_tempo",
+    "features_flags", "features_transacionais",
+    "gerar_abt",
+    "calcular_iv", "remover_vars", "calcular_ks", "cutoff_otimo_ks",
+]
+
+
+def medir(funcao, repeticoes: int = 1) -> dict:
+    """
+    Executa `funcao` `repeticoes` vezes e mede o tempo de parede (melhor e
+    mediana) e o pico de memória residente (maior entre as repetições).
+
+    Retorna dict com segundos, segundos_mediana, pico_rss_mb e o resultado
+    da última execução (chave "resultado").
+    """
+    tempos, picos = [], []
+    for _ in range(repeticoes):
+        zerar_pico_rss()
+        inicio = time.perf_counter()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", FutureWarning)
+            resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+        picos.append(pico_rss_mb())
+
+    return {
+        "segundos": round(min(tempos), 4),
+        "segundos_mediana": round(float(np.median(tempos)), 4),
+        "pico_rss_mb": round(max(picos), 1),
+        "resultado": resultado,
+    }
+
+
+def _preparar_dados(n_transacoes: int, diretorio_dados: str, seed: int) -> str:
+    """Pasta com as bases sintéticas da escala (geradas só na primeira vez)."""
+    pasta = os.path.join(diretorio_dados, f"tx_{n_transacoes}_seed_{seed}")
+    if not os.path.exists(os.path.join(pasta, "transacoes_case.csv")):
+        gerar_dados_sinteticos(pasta, n_transacoes=n_transacoes, seed=seed)
+    return pasta
+
+
+def _etapas_utils():
+    """Funções de utils, ou a mensagem de erro se as dependências faltarem."""
+    try:
+        from pipeline import utils
+    except ImportError as erro:
+        return None, f"indisponível: {erro}"
+    return utils, None
+
+
+def executar_benchmark(escalas=None, etapas=None, repeticoes: int = 1,
+                       diretorio_dados: str = DADOS_PADRAO, seed: int = 42,
+                       verbose: bool = True) -> list:
+    """
+    Mede cada etapa do pipeline (leitura, pré-processamento, índice, cada
+    família de features, gerar_abt e as funções de IV/KS de utils) sobre
+    bases sintéticas (ver dados_sinteticos) com `escalas` transações.
+
+    Cada escala usa as saídas das etapas anteriores como entrada: as
+    features partem das bases pré-processadas e IV/KS partem da ABT.
+
+    Retorna lista de registros com etapa, n_transacoes, linhas, segundos,
+    segundos_mediana, pico_rss_mb e linhas_por_s (ou erro, se a etapa falhou).
+    """
+    escalas = [int(n) for n in (escalas or ESCALAS_PADRAO)]
+    etapas = list(etapas or ETAPAS)
+    desconhecidas = [e for e in etapas if e not in ETAPAS]
+    if desconhecidas:
+        raise ValueError(f"etapas desconhecidas: {desconhecidas}")
+
+    utils, erro_utils = _etapas_utils()
+    registros = []
+
+    for n_transacoes in escalas:
+        pasta = _preparar_dados(n_transacoes, diretorio_dados, seed)
+        saida_abt = tempfile.mkdtemp(prefix="benchmark_abt_")
+        estado = {}
+
+        def dados():
+            if "dados" not in estado:
+                estado["dados"] = carregar_dados(pasta, cache=False)
+            return estado["dados"]
+
+        pasta_cache = os.path.join(pasta, "cache")
+
+        def carregar_com_cache():
+            # primeira leitura (fora da medição) cria o cache colunar
+            return sum(len(d) for d in carregar_dados(pasta, cache=pasta_cache).values())
+
+        def cli():
+            if "cli" not in estado:
+                estado["cli"] = preprocessar_clientes(dados()["clientes"])
+            return estado["cli"]
+
+        def inad():
+            if "inad" not in estado:
+                estado["inad"] = preprocessar_inadimplencia(dados()["inadimplencia"])
+            return estado["inad"]
+
+        def tx():
+            if "tx" not in estado:
+                estado["tx"] = preprocessar_transacoes(dados()["transacoes"])
+            return estado["tx"]
+
+        def indice():
+            if "indice" not in estado:
+                estado["indice"] = IndiceTransacoes(tx())
+            return estado["indice"]
+
+        def abt():
+            if "abt" not in estado:
+                estado["abt"] = gerar_abt(cli(), inad(), indice(), destino=saida_abt)
+            return estado["abt"]
+
+        def features_abt():
+            return [c for c in abt().select_dtypes("number").columns if c != "atraso_90d"]
+
+        def base_modelagem():
+            return abt().dropna(subset=["atraso_90d"])
+
+        def calcular_iv():
+            # mesmo laço de remover_vars (colunas sem as duas classes ficam NaN)
+            base = base_modelagem()
+            ivs = []
+            for c in features_abt():
+                try:
+                    ivs.append(utils.calcular_iv(base[[c, "atraso_90d"]].dropna(), c,
+                                                 "atraso_90d"))
+                except Exception:
+                    ivs.append(np.nan)
+            return ivs
+
+        def calcular_ks():
+            base = base_modelagem()
+            return [utils.calcular_ks(base, c) for c in features_abt()]
+
+        def cutoff_otimo_ks():
+            base = base_modelagem()
+            score = base[features_abt()[0]].fillna(0)
+            return utils.cutoff_otimo_ks(base["atraso_90d"], score)
+
+        # etapa -> (função medida, linhas processadas, depende de utils)
+        definicoes = {
+            "carregar_dados": (lambda: carregar_dados(pasta, cache=False),
+                               lambda: sum(len(d) for d in dados().values()), False),
+            "carregar_dados_cache": (lambda: carregar_dados(pasta, cache=pasta_cache),
+                                     carregar_com_cache, False),
+            "preprocessar_clientes": (lambda: preprocessar_clientes(dados()["clientes"]),
+                                      lambda: len(dados()["clientes"]), False),
+            "preprocessar_inadimplencia": (
+                lambda: preprocessar_inadimplencia(dados()["inadimplencia"]),
+                lambda: len(dados()["inadimplencia"]), False),
+            "preprocessar_transacoes": (lambda: preprocessar_transacoes(dados()["transacoes"]),
+                                        lambda: len(dados()["transacoes"]), False),
+            "indice_transacoes": (lambda: IndiceTransacoes(tx()), lambda: len(tx()), False),
+            "features_clientes": (lambda: features_clientes(cli(), inad()),
+                                  lambda: len(inad()), False),
+            "features_valor": (lambda: features_valor_flex(indice(), inad()),
+                               lambda: len(inad()), False),
+            "features_quantidade": (lambda: features_quantidade_flex(indice(), inad()),
+                                    lambda: len(inad()), False),
+            "features_tempo": (lambda: features_tempo_flex(indice(), inad()),
+                               lambda: len(inad()), False),
+            "features_flags": (lambda: features_flags_flex(indice(), inad()),
+                               lambda: len(inad()), False),
+            "features_transacionais": (lambda: features_transacionais(indice(), inad()),
+                                       lambda: len(inad()), False),
+            "gerar_abt": (lambda: gerar_abt(cli(), inad(), tx(), destino=saida_abt),
+                          lambda: len(inad()), False),
+            "calcular_iv": (calcular_iv, lambda: len(base_modelagem()), True),
+            "remover_vars": (lambda: utils.remover_vars(
+                                 base_modelagem()[features_abt() + ["atraso_90d"]]),
+                             lambda: len(base_modelagem()), True),
+            "calcular_ks": (calcular_ks, lambda: len(base_modelagem()), True),
+            "cutoff_otimo_ks": (cutoff_otimo_ks, lambda: len(base_modelagem()), True),
+        }
+
+        for etapa in etapas:
+            funcao, linhas, de_utils = definicoes[etapa]
+            registro = {"etapa": etapa, "n_transacoes": n_transacoes}
+
+            if de_utils and utils is None:
+                registro["erro"] = erro_utils
+            else:
+                try:
+                    n_linhas = linhas()  # entradas prontas antes de medir
+                    medida = medir(funcao, repeticoes)
+                    medida.pop("resultado")
+                    registro.update(linhas=n_linhas, **medida)
+                    registro["linhas_por_s"] = (round(n_linhas / medida["segundos"], 1)
+                                                if medida["segundos"] > 0 else None)
+                except Exception as erro:
+                    registro["erro"] = f"{type(erro).__name__}: {erro}"
+
+            registros.append(registro)
+            if verbose:
+                if "erro" in registro:
+                    print(f"[{n_transacoes:>11,}] {etapa:<28} {registro['erro']}")
+                else:
+                    print(f"[{n_transacoes:>11,}] {etapa:<28} {registro['segundos']:>9.3f}s "
+                          f"{registro['pico_rss_mb']:>9.1f} MB "
+                          f"{registro['linhas_por_s'] or 0:>14,.0f} linhas/s")
+
+        shutil.rmtree(saida_abt, ignore_errors=True)
+
+    return registros
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def salvar_historico(registros: list, caminho: str = HISTORICO_PADRAO,
+                     rotulo: str = None) -> dict:
+    """
+    Acrescenta uma execução ao histórico JSON (lista de execuções, cada uma
+    com data, commit, versões e registros) e retorna a execução gravada.
+    """
+    execucao = {
+        "data": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "commit": _commit_atual(),
+        "rotulo": rotulo,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "cpus": os.cpu_count(),
+        "registros": registros,
+    }
+
+    historico = carregar_historico(caminho)
+    historico.append(execucao)
+
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w") as f:
+        json.dump(historico, f, indent=1, ensure_ascii=False)
+    os.replace(temporario, caminho)
+    return execucao
+
+
+def carregar_historico(caminho: str = HISTORICO_PADRAO) -> list:
+    """Execuções gravadas no histórico (lista vazia se não existir)."""
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho) as f:
+        return json.load(f)
+
+
+def _tabela(execucao: dict) -> pd.DataFrame:
+    tabela = pd.DataFrame(execucao["registros"])
+    if "segundos" not in tabela.columns:
+        tabela["segundos"] = np.nan
+    return tabela
+
+
+def curva_escala(execucao: dict, medida: str = "segundos") -> pd.DataFrame:
+    """Tabela etapa x n_transacoes de uma execução (curva de escala)."""
+    tabela = _tabela(execucao)
+    return tabela.pivot_table(index="etapa", columns="n_transacoes", values=medida,
+                              sort=False)
+
+
+def comparar_execucoes(historico: list, base: int = -2, atual: int = -1) -> pd.DataFrame:
+    """
+    Compara duas execuções do histórico (por posição; padrão: penúltima x
+    última) por etapa e escala. razao = segundos_atual / segundos_base
+    (< 1 indica que ficou mais rápido).
+    """
+    chaves = ["etapa", "n_transacoes"]
+    antes = _tabela(historico[base])[chaves + ["segundos"]]
+    depois = _tabela(historico[atual])[chaves + ["segundos"]]
+    comparacao = antes.merge(depois, on=chaves, suffixes=("_base", "_atual"))
+    comparacao["razao"] = (comparacao["segundos_atual"] / comparacao["segundos_base"]).round(3)
+    return comparacao
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark das etapas do pipeline em bases sintéticas de várias escalas.")
+    parser.add_argument("--escalas", type=float, nargs="+", default=ESCALAS_PADRAO,
+                        help="número de transações de cada escala (ex.: 1e4 1e5 1e6)")
+    parser.add_argument("--etapas", nargs="+", default=None, choices=ETAPAS)
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--historico", default=HISTORICO_PADRAO)
+    parser.add_argument("--dados", default=DADOS_PADRAO,
+                        help="pasta das bases sintéticas (reaproveitadas entre execuções)")
+    parser.add_argument("--rotulo", default=None, help="descrição livre da execução")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    registros = executar_benchmark(args.escalas, args.etapas, args.repeticoes,
+                                   args.dados, args.seed)
+    execucao = salvar_historico(registros, args.historico, args.rotulo)
+
+    with pd.option_context("display.width", 200, "display.max_rows", 200):
+        print("\nSegundos por etapa e escala:")
+        print(curva_escala(execucao))
+
+        historico = carregar_historico(args.historico)
+        if len(historico) > 1:
+            print(f"\nComparação com a execução anterior ({historico[-2]['commit']}):")
+            print(comparar_execucoes(historico))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import os
+import time
+import json
+import hashlib
+
+import pandas as pd
+
+import features.features_clientes
+import features.features_valor
+import features.features_quantidade
+import features.features_tempo
+import features.features_flags
+import features.features_transacionais
+import features.janelas
+import features.indice_transacoes
+from features.indice_transacoes import IndiceTransacoes
+
+# Incrementar quando o formato dos arquivos do cache mudar
+VERSAO_CACHE = 1
+
+# Pasta padrão do cache de features (data/cache/features na raiz do projeto)
+PASTA_CACHE_FEATURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    "data", "cache", "features")
+
+# Módulos cujo código determina o resultado de cada família de features;
+# qualquer alteração neles invalida apenas as entradas da família
+_BASE_TRANSACIONAL = [features.janelas, features.indice_transacoes]
+MODULOS_FAMILIA = {
+    "clientes": [features.features_clientes],
+    "valor": [features.features_valor] + _BASE_TRANSACIONAL,
+    "quantidade": [features.features_quantidade] + _BASE_TRANSACIONAL,
+    "tempo": [features.features_tempo] + _BASE_TRANSACIONAL,
+    "flags": [features.features_flags] + _BASE_TRANSACIONAL,
+    "transacionais": [features.features_transacionais, features.features_valor,
+                      features.features_quantidade, features.features_tempo,
+                      features.features_flags] + _BASE_TRANSACIONAL,
+}
+
+
+def hash_entrada(dados) -> str:
+    """
+    Hash (sha256) do conteúdo de uma entrada das features: DataFrame
+    (colunas, dtypes e valores) ou IndiceTransacoes (vetores ordenados).
+    """
+    h = hashlib.sha256()
+
+    if isinstance(dados, IndiceTransacoes):
+        h.update(json.dumps([dados.id_col, dados.dt_col, dados.val_col]).encode())
+        h.update(pd.util.hash_pandas_object(pd.Series(dados.clientes),
+                                            index=False).to_numpy().tobytes())
+        for vetor in [dados.codigos, dados.dias, dados.valores]:
+            if vetor is not None:
+                h.update(vetor.tobytes())
+        return h.hexdigest()
+
+    h.update(json.dumps([[str(c) for c in dados.columns],
+                         [str(t) for t in dados.dtypes]]).encode())
+    h.update(pd.util.hash_pandas_object(dados, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def versao_codigo(familia: str) -> str:
+    """Hash do código-fonte dos módulos que calculam a família."""
+    h = hashlib.sha256()
+    for modulo in MODULOS_FAMILIA[familia]:
+        with open(modulo.__file__, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class CacheFeatures:
+    """
+    Cache em disco, endereçado por conteúdo, dos blocos de features da ABT.
+
+    Cada bloco (uma família já alinhada às linhas de df_inad) é gravado em
+    Parquet com nome `<familia>-<chave>.parquet`, onde a chave é o hash de:
+    família, versão do código da família, hash das entradas usadas por ela,
+    especificação de janelas e usar_M_1. Assim, alterar um CSV, uma janela ou o
+    código de um módulo só recalcula as famílias afetadas.
+
+    Remoção (limpar): entradas com mais de `idade_max_dias` dias sem uso e, em
+    seguida, as menos usadas recentemente até o total caber em `tamanho_max_mb`.
+    """
+
+    def __init__(self, diretorio: str = PASTA_CACHE_FEATURES,
+                 tamanho_max_mb: float = 2048,
+                 idade_max_dias: float = 30):
+        self.diretorio = diretorio
+        self.tamanho_max_mb = tamanho_max_mb
+        self.idade_max_dias = idade_max_dias
+        os.makedirs(diretorio, exist_ok=True)
+
+    def chave(self, familia: str, hashes_entradas: list, espec=None,
+              usar_M_1: bool = True) -> str:
+        """Chave de conteúdo de um bloco de features."""
+        conteudo = {
+            "versao_cache": VERSAO_CACHE,
+            "familia": familia,
+            "codigo": versao_codigo(familia),
+            "entradas": list(hashes_entradas),
+            "janelas": espec,
+            "usar_M_1": bool(usar_M_1),
+        }
+        texto = json.dumps(conteudo, sort_keys=True, default=str)
+        return hashlib.sha256(texto.encode()).hexdigest()
+
+    def _caminho(self, familia: str, chave: str) -> str:
+        return os.path.join(self.diretorio, f"{familia}-{chave[:32]}.parquet")
+
+    def ler(self, familia: str, chave: str):
+        """Bloco armazenado para a chave, ou None se não houver."""
+        caminho = self._caminho(familia, chave)
+        if not os.path.exists(caminho):
+            return None
+        bloco = pd.read_parquet(caminho)
+        os.utime(caminho)  # marca o uso para a remoção por idade/LRU
+        return bloco
+
+    def gravar(self, familia: str, chave: str, bloco: pd.DataFrame):
+        """Grava o bloco de forma atômica (arquivo temporário + rename)."""
+        caminho = self._caminho(familia, chave)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        bloco.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho)
+
+    def limpar(self) -> list:
+        """Aplica as regras de remoção e retorna os arquivos removidos."""
+        agora = time.time()
+        entradas = []
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith(".parquet"):
+                caminho = os.path.join(self.diretorio, nome)
+                info = os.stat(caminho)
+                entradas.append((info.st_mtime, info.st_size, caminho))
+
+        removidos = []
+        idade_max = self.idade_max_dias * 86400
+        restantes = []
+        for mtime, tamanho, caminho in sorted(entradas):
+            if agora - mtime > idade_max:
+                os.remove(caminho)
+                removidos.append(caminho)
+            else:
+                restantes.append((mtime, tamanho, caminho))
+
+        total = sum(tamanho for _, tamanho, _ in restantes)
+        limite = self.tamanho_max_mb * 1024 ** 2
+        for mtime, tamanho, caminho in restantes:  # mais antigos primeiro
+            if total <= limite:
+                break
+            os.remove(caminho)
+            removidos.append(caminho)
+            total -= tamanho
+
+        return removidos
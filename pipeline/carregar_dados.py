@@ -1,6 +1,166 @@
+import os
+import json
+import hashlib
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
 import pandas as pd
+import numpy as np
+
+from pipeline.instrumentacao import etapa, instrumentar, na_etapa_atual
+
+# Incrementar quando o formato do cache das bases originais mudar
+VERSAO_CACHE_BRUTO = 1
+
+# Pasta padrão do cache colunar das bases originais (data/cache/raw na raiz)
+PASTA_CACHE_BRUTO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "data", "cache", "raw")
+
+# Tipos de cada coluna dos CSVs originais. Datas e mes_safra ficam como texto
+# (convertidos em preprocess.py); colunas inteiras com nulos viram float64,
+# como na inferência do pandas.
+ESQUEMA_CSV = {
+    "clientes": {
+        "id_cliente": "string",
+        "idade": "int64",
+        "renda_mensal": "int64",
+        "data_abertura_conta": "string",
+        "estado_civil": "string",
+        "tempo_emprego_anos": "float64",
+        "qtde_produtos": "int64",
+        "score_interno": "int64",
+        "limite_credito": "int64",
+    },
+    "inadimplencia": {
+        "id_cliente": "string",
+        "mes_safra": "string",
+        "atraso_90d": "int64",
+    },
+    "transacoes": {
+        "id_cliente": "string",
+        "valor_transacao": "float64",
+        "data_transacao": "string",
+    },
+}
+
+
+def _ler_csv_pandas(caminho):
+    return pd.read_csv(caminho, sep=";")
+
+
+def opcoes_csv(esquema=None) -> dict:
+    """Opções do leitor CSV do pyarrow para os arquivos do case (';' e tipos do esquema)."""
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    tipos = {coluna: pa.type_for_alias(tipo) for coluna, tipo in (esquema or {}).items()}
+    return {
+        "parse_options": pa_csv.ParseOptions(delimiter=";"),
+        "convert_options": pa_csv.ConvertOptions(column_types=tipos, strings_can_be_null=True),
+    }
+
+
+def ler_csv_tipado(caminho, esquema=None) -> pd.DataFrame:
+    """
+    Lê um CSV (';') com o leitor multithread do pyarrow e os tipos de
+    `esquema` (dict coluna -> tipo); colunas fora do esquema são inferidas.
+    Se algum valor não couber no tipo declarado, lê com pd.read_csv.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    try:
+        tabela = pa_csv.read_csv(caminho, **opcoes_csv(esquema))
+    except pa.ArrowInvalid as erro:
+        warnings.warn(f"{caminho}: fora do esquema ({erro}); lendo com pd.read_csv.")
+        return _ler_csv_pandas(caminho)
+
+    return nulos_como_nan(tabela.to_pandas())
+
+
+def nulos_como_nan(df: pd.DataFrame) -> pd.DataFrame:
+    """Nulos das colunas de texto como NaN (o Arrow devolve None), como no pd.read_csv."""
+    for coluna in df.columns[df.dtypes == object]:
+        nulos = df[coluna].isna()
+        if nulos.any():
+            df.loc[nulos, coluna] = np.nan
+    return df
+
 
-def carregar_dados(diretorio_dados="../data/raw"):
+def _hash_arquivo(caminho) -> str:
+    with open(caminho, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _ler_com_cache(caminho, esquema, pasta_cache, formato):
+    """
+    Lê o CSV a partir do cache colunar (Feather ou Parquet) quando ele
+    corresponde ao arquivo de origem; senão lê o CSV e grava o cache.
+
+    O cache vale se a versão e o esquema forem os mesmos e o arquivo não
+    mudou: mesmo mtime e tamanho, ou, se só o mtime mudou, mesmo sha256.
+    """
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    # o mesmo nome de arquivo pode vir de pastas diferentes (raw, synthetic...)
+    nome += "-" + hashlib.sha256(os.path.abspath(caminho).encode()).hexdigest()[:12]
+    arquivo_cache = os.path.join(pasta_cache, f"{nome}.{formato}")
+    arquivo_meta = os.path.join(pasta_cache, f"{nome}.json")
+
+    info = os.stat(caminho)
+    origem = {"versao": VERSAO_CACHE_BRUTO, "origem": os.path.abspath(caminho),
+              "esquema": esquema, "formato": formato}
+
+    if os.path.exists(arquivo_cache) and os.path.exists(arquivo_meta):
+        with open(arquivo_meta) as f:
+            meta = json.load(f)
+        if all(meta.get(k) == v for k, v in origem.items()) and meta["tamanho"] == info.st_size:
+            valido = meta["mtime_ns"] == info.st_mtime_ns
+            if not valido and meta["sha256"] == _hash_arquivo(caminho):
+                valido = True  # arquivo regravado com o mesmo conteúdo
+                meta["mtime_ns"] = info.st_mtime_ns
+                _gravar_json(meta, arquivo_meta)
+            if valido:
+                if formato == "feather":
+                    return nulos_como_nan(pd.read_feather(arquivo_cache)), True
+                return nulos_como_nan(pd.read_parquet(arquivo_cache)), True
+
+    df = ler_csv_tipado(caminho, esquema)
+
+    os.makedirs(pasta_cache, exist_ok=True)
+    temporario = f"{arquivo_cache}.{os.getpid()}.tmp"
+    if formato == "feather":
+        df.to_feather(temporario)
+    else:
+        df.to_parquet(temporario, index=False)
+    os.replace(temporario, arquivo_cache)
+    _gravar_json({**origem, "mtime_ns": info.st_mtime_ns, "tamanho": info.st_size,
+                  "sha256": _hash_arquivo(caminho)}, arquivo_meta)
+
+    return df, False
+
+
+def _gravar_json(conteudo, caminho):
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w") as f:
+        json.dump(conteudo, f)
+    os.replace(temporario, caminho)
+
+
+def _ler_base(caminho, esquema, motor, pasta_cache, formato_cache):
+    with etapa("ler_csv", arquivo=caminho) as registro:
+        if motor == "pandas":
+            df, do_cache = _ler_csv_pandas(caminho), False
+        elif pasta_cache is None:
+            df, do_cache = ler_csv_tipado(caminho, esquema), False
+        else:
+            df, do_cache = _ler_com_cache(caminho, esquema, pasta_cache, formato_cache)
+        registro.update(linhas_saida=len(df), cache=do_cache)
+    return df
+
+
+@instrumentar()
+def carregar_dados(diretorio_dados="../data/raw", motor="pyarrow", cache=True,
+                   formato_cache="feather", n_threads=3):
     """
     Lê os dados originais enviados para a resolução do case e retorna em formato de dicionário.
 
@@ -8,15 +168,32 @@ def carregar_dados(diretorio_dados="../data/raw"):
       - clientes_case.csv
       - inadimplencia_case.csv
       - transacoes_case.csv
+
+    Parâmetros
+    ----------
+    motor : "pyarrow" (leitor multithread com os tipos de ESQUEMA_CSV) ou
+        "pandas" (pd.read_csv com inferência de tipos, sem cache).
+    cache : True (pasta PASTA_CACHE_BRUTO), caminho de uma pasta ou False.
+        Na primeira leitura cada CSV é convertido para `formato_cache`
+        ("feather" ou "parquet"); as seguintes leem o cache enquanto o CSV
+        de origem não mudar (mtime/tamanho e sha256).
+    n_threads : número de arquivos lidos ao mesmo tempo.
+
+    Os DataFrames retornados são os mesmos nos dois motores.
     """
-    df_clientes = pd.read_csv(f"{diretorio_dados}/clientes_case.csv", sep=";")
-    df_inadimplencia = pd.read_csv(
-        f"{diretorio_dados}/inadimplencia_case.csv", sep=";")
-    df_transacoes = pd.read_csv(
-        f"{diretorio_dados}/transacoes_case.csv", sep=";")
+    if motor not in ("pyarrow", "pandas"):
+        raise ValueError(f"motor inválido: {motor!r} (use 'pyarrow' ou 'pandas').")
+    if formato_cache not in ("feather", "parquet"):
+        raise ValueError(f"formato_cache inválido: {formato_cache!r} (use 'feather' ou 'parquet').")
 
-    return {
-        "clientes": df_clientes,
-        "inadimplencia": df_inadimplencia,
-        "transacoes": df_transacoes
-    }
+    pasta_cache = PASTA_CACHE_BRUTO if cache is True else (cache or None)
+
+    nomes = ["clientes", "inadimplencia", "transacoes"]
+    ler_base = na_etapa_atual(_ler_base)  # ler_csv como filha de carregar_dados
+    with ThreadPoolExecutor(max_workers=max(1, n_threads)) as pool:
+        futuros = {
+            nome: pool.submit(ler_base, f"{diretorio_dados}/{nome}_case.csv",
+                              ESQUEMA_CSV[nome], motor, pasta_cache, formato_cache)
+            for nome in nomes
+        }
+        return {nome: futuros[nome].result() for nome in nomes}
@@ -0,0 +1,180 @@
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import numpy as np
+
+from features.indice_transacoes import IndiceTransacoes
+from features.janelas import especificar_janelas, preparar_contexto
+from features.features_clientes import features_clientes, anos_relacionamento
+from features.features_transacionais import COLUNAS_FAMILIA
+from features.selecao_features import resolver_colunas
+from pipeline.criar_abt import CHAVES_ABT
+
+
+class ConsultaFeatures:
+    """
+    Consulta pontual (point-in-time) das features da ABT para um único
+    (id_cliente, data_referencia), para decisões de crédito online.
+
+    Tudo o que depende do histórico é preparado uma única vez na construção:
+    - o IndiceTransacoes (transações ordenadas por cliente/data) e seus
+      acumulados de valor;
+    - as features cadastrais de cada cliente (features_clientes), das quais só
+      o tempo de relacionamento depende da data e é recalculado por consulta.
+
+    As features transacionais usam o mesmo contexto de janelas e os mesmos
+    construtores de colunas da ABT em lote (mesmas definições e convenções de
+    NaN/-1), com uma busca binária O(log n) por janela no índice.
+
+    Parâmetros
+    ----------
+    df_clientes : DataFrame pré-processado de clientes.
+    df_tx : DataFrame pré-processado de transações ou IndiceTransacoes.
+    usar_M_1, janelas, colunas : como em gerar_abt (colunas restringe as
+        famílias e janelas calculadas por consulta).
+    """
+
+    def __init__(self, df_clientes, df_tx, usar_M_1=True, janelas=None, colunas=None):
+        if isinstance(df_tx, IndiceTransacoes):
+            self.indice = df_tx
+        else:
+            self.indice = IndiceTransacoes(df_tx)
+
+        self.usar_M_1 = usar_M_1
+        self.colunas = colunas
+
+        espec = especificar_janelas(janelas)
+        if colunas is None:
+            self.espec, self.familias = espec, list(COLUNAS_FAMILIA)
+            self._com_clientes = True
+        else:
+            selecao = resolver_colunas(colunas, espec)
+            self.espec, self.familias = selecao["espec"], selecao["familias"]
+            self._com_clientes = any(c not in CHAVES_ABT for c in selecao["outras"])
+
+        if "valor" in self.familias:
+            self.indice.acumulados  # pré-calcula somas/máximos/mínimos
+
+        # features cadastrais por cliente (tempo_relacionamento_anos é refeito
+        # a cada consulta, pois depende do cutoff)
+        ids = df_clientes["id_cliente"].drop_duplicates()
+        base = features_clientes(df_clientes, pd.DataFrame({"id_cliente": ids,
+                                                            "data_referencia": pd.NaT}))
+        base = base.set_index("id_cliente").drop(columns="data_referencia")
+        self._cadastrais = base.to_dict("index")
+        self._cadastrais_vazio = {col: np.nan for col in base.columns}
+        self._abertura = df_clientes.drop_duplicates("id_cliente").set_index(
+            "id_cliente").get("data_abertura_conta")
+
+    def consultar(self, id_cliente, data_referencia) -> dict:
+        """
+        Vetor de features de um cliente em uma data de referência
+        (dict coluna -> valor, na ordem das colunas da ABT).
+        """
+        id_cliente = str(id_cliente)
+        ref = pd.Timestamp(data_referencia)
+        feats = {"id_cliente": id_cliente, "data_referencia": ref}
+
+        if self._com_clientes:
+            cadastrais = dict(self._cadastrais.get(id_cliente, self._cadastrais_vazio))
+            if self._abertura is not None and id_cliente in self._cadastrais:
+                anos = anos_relacionamento(pd.Series([ref]),
+                                           pd.Series([self._abertura[id_cliente]]),
+                                           self.usar_M_1)
+                cadastrais["tempo_relacionamento_anos"] = anos.iloc[0]
+            feats.update(cadastrais)
+
+        if self.familias:
+            inad = pd.DataFrame({"id_cliente": [id_cliente], "data_referencia": [ref]})
+            val_col = self.indice.val_col if "valor" in self.familias else None
+            contexto = preparar_contexto(self.indice, inad, self.espec,
+                                         usar_M_1=self.usar_M_1, val_col=val_col)
+            for familia in self.familias:
+                for coluna, valores in COLUNAS_FAMILIA[familia](contexto).items():
+                    feats[coluna] = valores[0]
+
+        if self.colunas is not None:
+            feats = {coluna: feats[coluna] for coluna in CHAVES_ABT + [
+                c for c in self.colunas if c not in CHAVES_ABT]}
+        return feats
+
+
+def _para_json(valor):
+    """Converte valores pandas/NumPy em tipos serializáveis (NaN/NaT → null)."""
+    if pd.api.types.is_scalar(valor) and pd.isna(valor):
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return valor.isoformat()
+    if isinstance(valor, np.generic):
+        return valor.item()
+    return valor
+
+
+def servir(consulta: ConsultaFeatures, host: str = "127.0.0.1", porta: int = 8000):
+    """
+    Servidor HTTP local (somente biblioteca padrão) para a consulta pontual:
+
+        GET /features?id_cliente=C0001&data_referencia=2024-06-30
+
+    Responde JSON com as features (ou {"erro": ...} com status 400).
+    Bloqueia até ser interrompido (Ctrl+C).
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            parametros = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+            if url.path != "/features":
+                return self._responder(404, {"erro": "use /features"})
+            faltantes = [p for p in CHAVES_ABT if p not in parametros]
+            if faltantes:
+                return self._responder(400, {"erro": f"parâmetros ausentes: {faltantes}"})
+            try:
+                feats = consulta.consultar(parametros["id_cliente"],
+                                           parametros["data_referencia"])
+            except ValueError as erro:
+                return self._responder(400, {"erro": str(erro)})
+
+            self._responder(200, {k: _para_json(v) for k, v in feats.items()})
+
+        def _responder(self, status, corpo):
+            dados = json.dumps(corpo).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def log_message(self, *args):
+            pass
+
+    with ThreadingHTTPServer((host, porta), Handler) as servidor:
+        servidor.serve_forever()
+
+
+def medir_latencia(consulta: ConsultaFeatures, pares, repeticoes: int = 1) -> dict:
+    """
+    Latência da consulta pontual sobre uma lista de pares
+    (id_cliente, data_referencia).
+
+    Retorna dict com n, p50_ms, p99_ms, media_ms e max_ms.
+    """
+    tempos = []
+    for _ in range(repeticoes):
+        for id_cliente, data_referencia in pares:
+            inicio = time.perf_counter()
+            consulta.consultar(id_cliente, data_referencia)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+
+    tempos = np.array(tempos)
+    return {
+        "n": len(tempos),
+        "p50_ms": round(float(np.percentile(tempos, 50)), 3),
+        "p99_ms": round(float(np.percentile(tempos, 99)), 3),
+        "media_ms": round(float(tempos.mean()), 3),
+        "max_ms": round(float(tempos.max()), 3),
+    }
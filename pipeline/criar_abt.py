@@ -1,66 +1,665 @@
 import pandas as pd
+import numpy as np
 import os
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 
 from features.features_clientes import features_clientes
 from features.features_valor import features_valor_flex
 from features.features_quantidade import features_quantidade_flex
 from features.features_tempo import features_tempo_flex
 from features.features_flags import features_flags_flex
+from features.features_transacionais import features_transacionais
+from features.indice_transacoes import IndiceTransacoes
+from features.cubo_mensal import CuboMensal
+from features.janelas import especificar_janelas
+from features.selecao_features import resolver_colunas
+from pipeline.cache_features import CacheFeatures, hash_entrada
+from pipeline.esquema_abt import compactar_abt
+from pipeline.instrumentacao import etapa, instrumentar
 
 
-def gerar_abt(df_clientes, df_inad, df_tx, usar_M_1=True):
+CHAVES_ABT = ["id_cliente", "data_referencia"]
+
+# Pasta padrão de saída da ABT (data/processed na raiz do projeto)
+PASTA_SAIDA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "data", "processed")
+
+
+def alinhar_features(feats, df_inad, chaves=CHAVES_ABT):
     """
-    Consolida a ABT (Analytical Base Table) com todas as features.
+    Reordena um bloco de features para a ordem das linhas de df_inad e remove
+    as colunas-chave, permitindo montar a ABT por concatenação de colunas.
+
+    Blocos já produzidos na ordem de df_inad (famílias transacionais) são
+    usados como estão; os demais (ex.: features_clientes, ordenado por
+    cliente/safra) são realinhados com uma única busca pelas chaves.
+    Equivale ao merge left quando as chaves de df_inad são únicas; com chaves
+    repetidas, cada linha de df_inad recebe uma única linha de features (o merge
+    multiplicaria as linhas).
+    """
+    feats = feats.reset_index(drop=True)
+    alvo = df_inad[chaves].reset_index(drop=True)
+
+    if len(feats) != len(alvo) or not feats[chaves].equals(alvo):
+        indice_feats = pd.MultiIndex.from_frame(feats[chaves])
+        if not indice_feats.is_unique:
+            # safras repetidas em df_inad geram linhas idênticas no bloco
+            unicas = ~indice_feats.duplicated()
+            feats = feats[unicas].reset_index(drop=True)
+            indice_feats = indice_feats[unicas]
+        posicoes = indice_feats.get_indexer(pd.MultiIndex.from_frame(alvo))
+        if (posicoes < 0).any():
+            feats = feats.reindex(posicoes).reset_index(drop=True)
+        else:
+            feats = feats.take(posicoes).reset_index(drop=True)
+
+    return feats.drop(columns=chaves)
+
+
+# Famílias de features transacionais calculadas a partir do índice de transações
+FAMILIAS_TRANSACIONAIS = {
+    "transacionais": features_transacionais,
+    "valor": features_valor_flex,
+    "quantidade": features_quantidade_flex,
+    "tempo": features_tempo_flex,
+    "flags": features_flags_flex,
+}
+
+
+def _obter_cubo(df_tx, cubo) -> CuboMensal:
+    """
+    Resolve a opção `cubo` de gerar_abt:
+    - CuboMensal : usado como está.
+    - True       : constrói o cubo a partir de df_tx.
+    - str        : pasta de cubos persistidos; o cubo de df_tx fica em uma
+                   subpasta com o hash de conteúdo das transações e é lido de lá
+                   se já existir (construído e salvo caso contrário).
+    """
+    if isinstance(cubo, CuboMensal):
+        return cubo
+
+    pasta = None
+    if isinstance(cubo, str):
+        pasta = os.path.join(cubo, hash_entrada(df_tx))
+        if os.path.isdir(pasta):
+            with etapa("carregar_cubo_mensal"):
+                return CuboMensal.carregar(pasta)
+
+    with etapa("cubo_mensal", linhas_entrada=len(df_tx)):
+        resultado = CuboMensal.de_transacoes(df_tx)
+
+    if pasta is not None:
+        # grava em pasta temporária e renomeia, para nunca deixar um cubo incompleto
+        temporaria = f"{pasta}.{os.getpid()}.tmp"
+        resultado.salvar(temporaria)
+        try:
+            os.rename(temporaria, pasta)
+        except OSError:  # outro processo gravou o mesmo cubo antes
+            shutil.rmtree(temporaria, ignore_errors=True)
+    return resultado
+
+
+def _indice_sob_demanda(df_tx, cubo=None):
+    """
+    Retorna uma função que devolve o IndiceTransacoes de df_tx (ou o CuboMensal,
+    com a opção `cubo`), construindo-o apenas na primeira chamada (nenhuma vez se
+    todas as famílias vierem do cache).
+    """
+    memo = {}
+
+    def obter():
+        if "indice" not in memo:
+            if cubo is not None and cubo is not False:
+                memo["indice"] = _obter_cubo(df_tx, cubo)
+            elif isinstance(df_tx, IndiceTransacoes):
+                memo["indice"] = df_tx
+            else:
+                with etapa("indice_transacoes", linhas_entrada=len(df_tx)):
+                    memo["indice"] = IndiceTransacoes(df_tx)
+        return memo["indice"]
+
+    return obter
+
+
+def _hashes_bases(df_clientes, df_tx) -> dict:
+    """Hash de conteúdo do cadastro e das transações (o custo cresce com df_tx)."""
+    return {"clientes": hash_entrada(df_clientes), "transacoes": hash_entrada(df_tx)}
+
+
+def _hashes_entradas(df_clientes, df_inad, df_tx, bases=None) -> dict:
+    """
+    Hash de conteúdo das entradas de cada família (para o cache). `bases`
+    (saída de _hashes_bases) evita refazer o hash de df_clientes e df_tx
+    quando os mesmos são usados em várias chamadas (ex.: lotes).
+    """
+    bases = bases or _hashes_bases(df_clientes, df_tx)
+    h_inad = hash_entrada(df_inad[CHAVES_ABT])
+    return {familia: [h, h_inad] for familia, h in bases.items()}
+
+
+def _calcular_familia(familia, df_clientes, df_inad, obter_indice, usar_M_1, espec,
+                      familias_tx):
+    if familia == "clientes":
+        # 1. Features cadastrais (estáticas)
+        return features_clientes(df_clientes, df_inad, usar_M_1=usar_M_1)
+    if familia == "transacionais":
+        # 2-5. Valor, quantidade, tempo e flags em um único kernel
+        return features_transacionais(obter_indice(), df_inad, usar_M_1=usar_M_1,
+                                      janelas=espec, familias=familias_tx)
+    # 2-5. Cada família separada, todas sobre o mesmo índice
+    return FAMILIAS_TRANSACIONAIS[familia](obter_indice(), df_inad, usar_M_1=usar_M_1,
+                                           janelas=espec)
+
+
+def _montar_abt(df_clientes, df_inad, obter_indice, usar_M_1, fundido, espec,
+                cache=None, hashes=None, colunas=None):
+    if colunas is None:
+        familias_tx = ["valor", "quantidade", "tempo", "flags"]
+        com_clientes = True
+    else:
+        # só as famílias, janelas e comparações de que as colunas dependem
+        selecao = resolver_colunas(colunas, espec)
+        familias_tx, espec = selecao["familias"], selecao["espec"]
+        com_clientes = any(c not in df_inad.columns for c in selecao["outras"])
+
+    familias = ["clientes"] if com_clientes else []
+    if fundido and familias_tx:
+        familias.append("transacionais")
+    elif not fundido:
+        familias += familias_tx
+
+    blocos = []
+    for familia in familias:
+        if cache is not None:
+            entradas = hashes["clientes" if familia == "clientes" else "transacoes"]
+            espec_chave = espec
+            if familia == "transacionais" and colunas is not None:
+                espec_chave = {**espec, "familias": familias_tx}
+            chave = cache.chave(familia, entradas, espec_chave, usar_M_1)
+            bloco = cache.ler(familia, chave)
+        else:
+            bloco = None
+
+        if bloco is None:
+            with etapa(f"features_{familia}", linhas_entrada=len(df_inad)) as registro:
+                feats = _calcular_familia(familia, df_clientes, df_inad, obter_indice,
+                                          usar_M_1, espec, familias_tx)
+                registro["linhas_saida"] = len(feats)
+
+            with etapa("alinhar_features", linhas_entrada=len(feats), familia=familia):
+                bloco = alinhar_features(feats, df_inad)
+            if cache is not None:
+                cache.gravar(familia, chave, bloco)
+
+        if colunas is not None:
+            bloco = bloco[[c for c in bloco.columns if c in colunas]]
+        blocos.append(bloco)
+
+    with etapa("concatenar_abt", linhas_entrada=len(df_inad)):
+        abt = pd.concat([df_inad.reset_index(drop=True)] + blocos, axis=1)
+
+    if colunas is not None:
+        faltantes = [c for c in colunas if c not in abt.columns]
+        if faltantes:
+            raise ValueError(f"colunas inexistentes na ABT: {faltantes}")
+        abt = abt[list(df_inad.columns) + [c for c in colunas if c not in df_inad.columns]]
+
+    return abt
+
+
+def montar_abt(df_clientes, df_inad, df_tx, usar_M_1=True, fundido=True, janelas=None,
+               cache=None, colunas=None, cubo=None):
+    """
+    Calcula as features e consolida a ABT em memória, sem gravar arquivos.
+    Parâmetros iguais aos de gerar_abt.
+
+    Cada família gera um bloco de colunas alinhado às linhas de df_inad e a ABT
+    é montada com um único concat de colunas, sem cópias intermediárias da
+    tabela larga a cada família.
+
+    Com `cache` (CacheFeatures), cada família é lida do cache quando suas
+    entradas, janelas, usar_M_1 e código não mudaram, e calculada caso contrário.
+    """
+    espec = especificar_janelas(janelas)
+    hashes = _hashes_entradas(df_clientes, df_inad, df_tx) if cache is not None else None
+
+    return _montar_abt(df_clientes, df_inad, _indice_sob_demanda(df_tx, cubo), usar_M_1,
+                       fundido, espec, cache, hashes, colunas)
+
+
+def particionar_clientes(ids, n_shards):
+    """
+    Shard (0..n_shards-1) de cada id de cliente por hash estável, de forma que
+    todas as linhas de um mesmo cliente caiam sempre no mesmo shard.
+    """
+    hashes = pd.util.hash_pandas_object(pd.Series(ids).astype(str), index=False)
+    return (hashes.to_numpy() % np.uint64(n_shards)).astype(np.int64)
+
+
+def rotulo_cutoff(usar_M_1: bool) -> str:
+    """Rótulo da política de cutoff: "M1" (mês anterior) ou "M" (próprio mês)."""
+    return "M1" if usar_M_1 else "M"
+
+
+def montar_abts(df_clientes, df_inad, df_tx, politicas=(True, False), fundido=True,
+                janelas=None, cache=None, colunas=None, cubo=None) -> dict:
+    """
+    Monta uma ABT por política de cutoff (valores de usar_M_1) em uma única
+    passagem: o índice de transações (ordenação e somas/máximos/mínimos
+    acumulados por cliente) é construído uma vez e compartilhado entre as
+    políticas, que só refazem a busca dos limites de janela e as colunas.
+
+    Retorna dict rótulo ("M1"/"M") -> ABT.
+    """
+    espec = especificar_janelas(janelas)
+    obter_indice = _indice_sob_demanda(df_tx, cubo)
+    hashes = _hashes_entradas(df_clientes, df_inad, df_tx) if cache is not None else None
+
+    return {
+        rotulo_cutoff(m1): _montar_abt(df_clientes, df_inad, obter_indice, m1,
+                                       fundido, espec, cache, hashes, colunas)
+        for m1 in politicas
+    }
+
+
+def juntar_abts(abts: dict, chaves=None) -> pd.DataFrame:
+    """
+    Junta ABTs de políticas diferentes (saída de montar_abts) em um único
+    DataFrame largo. As colunas de df_inad (`chaves`) aparecem uma vez e as
+    features recebem o sufixo da política, ex.: qtde_trans_3m_M1, qtde_trans_3m_M.
+    """
+    abts = list(abts.items())
+    base = abts[0][1]
+    chaves = list(chaves) if chaves is not None else []
+
+    partes = [base[chaves]]
+    for rotulo, abt in abts:
+        features = abt.drop(columns=chaves)
+        partes.append(features.add_suffix(f"_{rotulo}"))
+
+    return pd.concat(partes, axis=1)
+
+
+def _validar_paralelismo(n_jobs, n_shards):
+    """n_jobs: None/-1 (todos os núcleos) ou >= 1; n_shards: None ou >= 1."""
+    if n_jobs not in (None, -1) and not n_jobs >= 1:
+        raise ValueError(f"n_jobs inválido: {n_jobs!r} (use -1 ou um inteiro >= 1).")
+    if n_shards is not None and not n_shards >= 1:
+        raise ValueError(f"n_shards inválido: {n_shards!r} (use um inteiro >= 1).")
+
+
+def _montar_abt_shard(args):
+    return montar_abts(*args)
+
+
+def montar_abt_paralelo(df_clientes, df_inad, df_tx, usar_M_1=True, fundido=True,
+                        janelas=None, n_jobs=-1, n_shards=None, cache=None,
+                        colunas=None, cubo=None):
+    """
+    Versão paralela de montar_abt, particionada por cliente.
+
+    Os clientes são distribuídos em `n_shards` por hash de id_cliente (cada
+    feature só olha as transações e safras do próprio cliente); cada shard é
+    processado em um pool de `n_jobs` processos e os resultados são concatenados
+    na ordem original de df_inad, reproduzindo exatamente a execução serial.
+
+    usar_M_1 também aceita uma lista de políticas; nesse caso retorna um dict
+    rótulo -> ABT como montar_abts.
+
+    cubo : só None/False ou True (um cubo por shard, construído no próprio shard).
+    """
+    if isinstance(df_tx, IndiceTransacoes):
+        raise ValueError(
+            "montar_abt_paralelo: informe o DataFrame de transações; o índice é "
+            "construído dentro de cada shard.")
+    if cubo not in (None, False, True):
+        raise ValueError(
+            "montar_abt_paralelo: use cubo=True; o cubo é construído dentro de "
+            "cada shard.")
+
+    _validar_paralelismo(n_jobs, n_shards)
+
+    multiplas = isinstance(usar_M_1, (list, tuple))
+    politicas = list(usar_M_1) if multiplas else [usar_M_1]
+
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    n_shards = n_shards or n_jobs
+
+    inad = df_inad.assign(_posicao_abt=np.arange(len(df_inad)))
+    shard_inad = particionar_clientes(inad["id_cliente"], n_shards)
+    shard_cli = particionar_clientes(df_clientes["id_cliente"], n_shards)
+    shard_tx = particionar_clientes(df_tx["id_cliente"], n_shards)
+
+    tarefas = [
+        (df_clientes[shard_cli == k], inad[shard_inad == k], df_tx[shard_tx == k],
+         politicas, fundido, janelas, cache, colunas, cubo)
+        for k in range(n_shards) if (shard_inad == k).any()
+    ]
+
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(tarefas) or 1)) as pool:
+        partes = list(pool.map(_montar_abt_shard, tarefas))
+
+    abts = {}
+    for m1 in politicas:
+        rotulo = rotulo_cutoff(m1)
+        abt = pd.concat([parte[rotulo] for parte in partes], ignore_index=True)
+        abt = abt.sort_values("_posicao_abt", kind="stable").drop(columns="_posicao_abt")
+        abts[rotulo] = abt.reset_index(drop=True)
+
+    return abts if multiplas else abts[rotulo_cutoff(usar_M_1)]
+
+
+@instrumentar()
+def gravar_abt_particionada(abt, diretorio, particao="mes_safra", arquivo=None,
+                            compressao="snappy", tamanho_row_group=None):
+    """
+    Grava a ABT como dataset Parquet particionado no layout hive
+    (<diretorio>/<particao>=<valor>/abt.parquet).
+
+    Só as partições presentes em `abt` são (re)escritas; as demais são
+    mantidas, o que permite acrescentar safras sem regravar o histórico.
+    A ordem das colunas fica em _colunas.json (ignorado por leitores Parquet).
+
+    arquivo : nome opcional do arquivo dentro de cada partição. Por padrão a
+        partição inteira é substituída por abt.parquet; com um nome (ex.: um
+        arquivo por shard de clientes), só esse arquivo é gravado e os demais
+        arquivos da partição são mantidos.
+    compressao, tamanho_row_group : repassados ao Parquet (ver salvar_abt).
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    with open(os.path.join(diretorio, "_colunas.json"), "w") as f:
+        json.dump(list(abt.columns), f)
+
+    for valor, grupo in abt.groupby(particao, sort=True, observed=True):
+        pasta = os.path.join(diretorio, f"{particao}={valor}")
+        os.makedirs(pasta, exist_ok=True)
+        nome = arquivo or "abt.parquet"
+        temporario = os.path.join(pasta, f".{nome}.tmp")
+        grupo.drop(columns=particao).to_parquet(temporario, index=False,
+                                                compression=compressao,
+                                                row_group_size=tamanho_row_group)
+        os.replace(temporario, os.path.join(pasta, nome))
+
+        if arquivo is None:
+            for antigo in _arquivos_particao(pasta):
+                if antigo != nome:
+                    os.remove(os.path.join(pasta, antigo))
+
+
+def _remover_particoes(diretorio, particao="mes_safra"):
+    """Remove as partições de um dataset gravado anteriormente em `diretorio`."""
+    if os.path.isdir(diretorio):
+        for nome in os.listdir(diretorio):
+            if nome.startswith(f"{particao}="):
+                shutil.rmtree(os.path.join(diretorio, nome))
+
+
+def _arquivos_particao(pasta):
+    return sorted(nome for nome in os.listdir(pasta)
+                  if nome.endswith(".parquet") and not nome.startswith((".", "_")))
+
+
+def ler_abt_particionada(diretorio, particao="mes_safra", valores=None, colunas=None):
+    """
+    Lê a ABT gravada por gravar_abt_particionada, arquivo a arquivo
+    (tipos divergentes entre partições, ex.: int/float, são unificados pelo
+    concat), restaurando a coluna de partição e a ordem original das colunas.
+
+    valores : lista opcional de partições a ler (padrão: todas).
+    colunas : lista opcional de colunas a ler (padrão: todas).
+    """
+    with open(os.path.join(diretorio, "_colunas.json")) as f:
+        ordem = json.load(f)
+    if colunas is not None:
+        ordem = [c for c in ordem if c in colunas]
+
+    partes = []
+    for nome in sorted(os.listdir(diretorio)):
+        if not nome.startswith(f"{particao}="):
+            continue
+        valor = nome.split("=", 1)[1]
+        if valores is not None and valor not in valores:
+            continue
+        pasta = os.path.join(diretorio, nome)
+        for arquivo in _arquivos_particao(pasta):
+            parte = pd.read_parquet(os.path.join(pasta, arquivo),
+                                    columns=[c for c in ordem if c != particao])
+            parte[particao] = valor
+            partes.append(parte)
+
+    if not partes:
+        return pd.DataFrame(columns=ordem)
+
+    return pd.concat(partes, ignore_index=True)[ordem]
+
+
+def salvar_abt(abt, usar_M_1=True, destino=PASTA_SAIDA, formato="parquet",
+               particionar=False, compressao="snappy", tamanho_row_group=None) -> list:
+    """
+    Grava a ABT em `destino` com o nome abt_M1 ou abt_M (conforme usar_M_1).
 
     Parâmetros
     ----------
-    df_clientes : DataFrame pré-processado de clientes
-    df_inad : DataFrame pré-processado de inadimplência
-    df_tx : DataFrame pré-processado de transações
-    usar_M_1 : bool
-        Define se cutoff das transações considera fim do próprio mês (False) ou mês anterior (True).
+    destino : str
+        Pasta de saída. O padrão é data/processed na raiz do projeto,
+        independente do diretório de trabalho.
+    formato : "parquet", "csv" ou lista (ex.: ["csv", "parquet"] reproduz a
+        gravação dupla antiga).
+    particionar : bool
+        Parquet como dataset particionado por mes_safra (pasta abt_M1/ com
+        mes_safra=AAAA-MM/abt.parquet), permitindo ler só as safras
+        necessárias com filtros (predicate pushdown), ex.:
+        pd.read_parquet(caminho, filters=[("mes_safra", ">=", "2025-01")]).
+    compressao : codec Parquet ("snappy", "zstd", "gzip", None...).
+    tamanho_row_group : linhas por row group do Parquet (None = padrão do pyarrow).
 
     Retorna
     -------
-    DataFrame consolidado (ABT).
+    Lista com os caminhos gravados.
     """
+    formatos = [formato] if isinstance(formato, str) else list(formato)
+    nome = f"abt_{rotulo_cutoff(usar_M_1)}"
+    os.makedirs(destino, exist_ok=True)
 
-    abt = df_inad.copy()
+    caminhos = []
+    for fmt in formatos:
+        if fmt not in ("parquet", "csv"):
+            raise ValueError(f"formato inválido: {fmt!r} (use 'parquet' ou 'csv').")
+        with etapa(f"gravar_{fmt}", linhas_entrada=len(abt), particionado=particionar):
+            caminhos.append(_gravar_formato(abt, fmt, destino, nome, particionar,
+                                            compressao, tamanho_row_group))
 
-    # 1. Features cadastrais (estáticas)
-    feats_cli = features_clientes(df_clientes, df_inad, usar_M_1=usar_M_1)
+    return caminhos
 
-    abt = abt.merge(feats_cli, on=["id_cliente","data_referencia"], 
-                    how="left")
 
-    # 2. Features de valor
-    feats_val = features_valor_flex(df_tx, df_inad, usar_M_1=usar_M_1)
-    abt = abt.merge(feats_val, on=["id_cliente","data_referencia"],
-                     how="left")
+def _gravar_formato(abt, fmt, destino, nome, particionar, compressao, tamanho_row_group):
+    if fmt == "csv":
+        caminho = os.path.join(destino, f"{nome}.csv")
+        abt.to_csv(caminho, index=False)
 
-    # 3. Features de quantidade
-    feats_qtd = features_quantidade_flex(df_tx, df_inad, usar_M_1=usar_M_1)
-    abt = abt.merge(feats_qtd, on=["id_cliente","data_referencia"], 
-                    how="left")
+    elif particionar:
+        caminho = os.path.join(destino, nome)
+        _remover_particoes(caminho)
+        gravar_abt_particionada(abt, caminho, compressao=compressao,
+                                tamanho_row_group=tamanho_row_group)
 
-    # 4. Features de tempo
-    feats_tmp = features_tempo_flex(df_tx, df_inad, usar_M_1=usar_M_1)
-    abt = abt.merge(feats_tmp, on=["id_cliente","data_referencia"], 
-                    how="left")
+    else:
+        caminho = os.path.join(destino, f"{nome}.parquet")
+        abt.to_parquet(caminho, index=False, compression=compressao,
+                       row_group_size=tamanho_row_group)
+
+    return caminho
+
+
+def gerar_abt_em_lotes(df_clientes, df_inad, df_tx, usar_M_1=True, fundido=True,
+                       janelas=None, por="mes_safra", n_shards=8, diretorio=None,
+                       cache=None, compactar=False):
+    """
+    Gerador que produz a ABT em lotes, um `mes_safra` (por="mes_safra") ou um
+    shard de clientes (por="cliente", `n_shards` partições por hash de
+    id_cliente) de cada vez, em vez de materializar a tabela inteira.
 
-    # 5. Flags
-    feats_flags = features_flags_flex(df_tx, df_inad, usar_M_1=usar_M_1)
-    abt = abt.merge(feats_flags, on=["id_cliente", "data_referencia"], 
-                    how="left")
+    O índice de transações é construído uma única vez (df_tx pode ser um
+    IndiceTransacoes já pronto, liberando o DataFrame de transações) e cada
+    lote é montado isoladamente (como em montar_abt), de modo que o pico de
+    memória fica em um lote mais o índice. Com cache, o hash de df_clientes e
+    das transações também é feito uma única vez.
 
-    os.makedirs('../data/processed', exist_ok=True)
+    diretorio : opcional. Cada lote é gravado assim que calculado no dataset
+        Parquet particionado por mes_safra (ver gravar_abt_particionada); as
+        partições existentes no diretório são removidas antes do primeiro lote.
+
+    compactar : se True, aplica o esquema compacto (ver pipeline.esquema_abt)
+        a cada lote.
+
+    Produz DataFrames com as mesmas colunas de gerar_abt, na ordem de df_inad
+    dentro de cada lote.
+    """
+    if por not in ("mes_safra", "cliente"):
+        raise ValueError(f"por inválido: {por!r} (use 'mes_safra' ou 'cliente').")
+
+    if isinstance(df_tx, IndiceTransacoes):
+        indice = df_tx
+    else:
+        indice = IndiceTransacoes(df_tx)
 
-    if usar_M_1:
-        abt.to_csv("../data/processed/abt_M1.csv", index=False)
-        abt.to_parquet("../data/processed/abt_M1.parquet", index=False)
+    espec = especificar_janelas(janelas)
+    obter_indice = _indice_sob_demanda(indice)
+    # hash de df_clientes/df_tx uma vez só; cada lote refaz só o das suas chaves
+    bases = _hashes_bases(df_clientes, indice) if cache is not None else None
 
+    if por == "mes_safra":
+        rotulos = df_inad["mes_safra"].to_numpy()
+        lotes = pd.unique(np.sort(rotulos))
     else:
-        abt.to_csv("../data/processed/abt_M.csv", index=False)
-        abt.to_parquet("../data/processed/abt_M.parquet", index=False)
+        rotulos = particionar_clientes(df_inad["id_cliente"], n_shards)
+        lotes = range(n_shards)
+
+    if diretorio is not None:
+        _remover_particoes(diretorio)
+
+    for lote in lotes:
+        mascara = rotulos == lote
+        if not mascara.any():
+            continue
+
+        inad = df_inad[mascara]
+        hashes = (_hashes_entradas(df_clientes, inad, indice, bases)
+                  if cache is not None else None)
+        abt = _montar_abt(df_clientes, inad, obter_indice, usar_M_1, fundido, espec,
+                          cache, hashes)
+        if compactar:
+            abt = compactar_abt(abt)
+
+        if diretorio is not None:
+            arquivo = None if por == "mes_safra" else f"shard-{lote:04d}.parquet"
+            gravar_abt_particionada(abt, diretorio, arquivo=arquivo)
+
+        yield abt
+
+
+@instrumentar()
+def gerar_abt(df_clientes, df_inad, df_tx, usar_M_1=True, fundido=True, janelas=None,
+              n_jobs=1, n_shards=None, largo=False, cache=None, compactar=False,
+              destino=PASTA_SAIDA, formato="parquet", particionar=False,
+              compressao="snappy", tamanho_row_group=None, colunas=None, cubo=None):
+    """
+    Consolida a ABT (Analytical Base Table) com todas as features.
+
+    Parâmetros
+    ----------
+    df_clientes : DataFrame pré-processado de clientes
+    df_inad : DataFrame pré-processado de inadimplência
+    df_tx : DataFrame pré-processado de transações (ou IndiceTransacoes já construído)
+    usar_M_1 : bool ou lista de bool
+        Define se cutoff das transações considera fim do próprio mês (False) ou mês anterior (True).
+        Uma lista, ex.: [True, False], monta as ABTs de todas as políticas em uma
+        única passagem sobre as transações indexadas (ver montar_abts).
+    fundido : bool
+        Se True (padrão), calcula as famílias de valor, quantidade, tempo e flags em
+        um único kernel (features_transacionais), resolvendo as janelas uma só vez.
+        Se False, chama cada função de feature separadamente.
+    janelas : None, lista de meses ou dict
+        Janelas/comparações usadas por todas as famílias transacionais
+        (ver features.janelas.especificar_janelas). Ex.: [1, 3, 6, 12, 18, 24, 36].
+        None mantém o conjunto padrão (1m, 3m, 6m, 9m, 12m, 24m, ever).
+    n_jobs : int
+        Número de processos. 1 (padrão) executa de forma serial; -1 usa todos os núcleos.
+        Outros valores < 1 levantam ValueError.
+        Com n_jobs != 1, df_tx deve ser o DataFrame de transações.
+    n_shards : int, opcional
+        Quantidade de partições de clientes no modo paralelo (padrão: n_jobs).
+        O resultado é idêntico ao da execução serial.
+    largo : bool
+        Só com usar_M_1 em lista: se True, retorna um único DataFrame com as
+        features sufixadas pela política (_M1, _M); se False (padrão), um dict
+        {"M1": abt_M1, "M": abt_M}.
+    cache : None, str ou CacheFeatures
+        Cache em disco dos blocos de features (ver pipeline.cache_features).
+        Um caminho cria um CacheFeatures nesse diretório com os limites padrão.
+        Só as famílias cujas entradas, janelas, cutoff ou código mudaram são
+        recalculadas; ao final, aplica a remoção por idade/tamanho.
+    compactar : bool
+        Se True, aplica o esquema compacto de tipos (Int8/16/32 anuláveis,
+        float32 e category; ver pipeline.esquema_abt) antes de gravar/retornar.
+        pipeline.esquema_abt.relatorio_memoria mostra o ganho por família.
+    destino, formato, particionar, compressao, tamanho_row_group :
+        Gravação de cada ABT (ver salvar_abt). O padrão é um único Parquet em
+        data/processed; destino=None não grava nada.
+    colunas : lista opcional de colunas de saída (ex.: remover_vars(...)["final"]).
+        Calcula só as famílias, janelas, comparações e agregados intermediários
+        de que essas colunas dependem (ver features.selecao_features) e
+        retorna as colunas de df_inad seguidas das pedidas, com os mesmos
+        valores da ABT completa.
+    cubo : None, True, str ou CuboMensal
+        Calcula as famílias transacionais sobre o cubo cliente x mês
+        (features.cubo_mensal) em vez do índice de transações, com os mesmos
+        valores (exige cutoffs no último dia do mês, como os de
+        preprocessar_inadimplencia). True constrói o cubo a partir de df_tx; um
+        caminho reaproveita o cubo salvo para o mesmo conteúdo de df_tx (ou o
+        constrói e salva); um CuboMensal já construído é usado como está.
+        Com n_jobs != 1 só cubo=True é aceito.
+
+    Retorna
+    -------
+    DataFrame consolidado (ABT), ou dict/DataFrame largo com uma ABT por política
+    quando usar_M_1 é uma lista.
+    """
+
+    _validar_paralelismo(n_jobs, n_shards)
+
+    multiplas = isinstance(usar_M_1, (list, tuple))
+    politicas = list(usar_M_1) if multiplas else [usar_M_1]
+
+    if isinstance(cache, str):
+        cache = CacheFeatures(cache)
+
+    if n_jobs == 1:
+        abts = montar_abts(df_clientes, df_inad, df_tx, politicas=politicas,
+                           fundido=fundido, janelas=janelas, cache=cache,
+                           colunas=colunas, cubo=cubo)
+    else:
+        abts = montar_abt_paralelo(df_clientes, df_inad, df_tx, usar_M_1=politicas,
+                                   fundido=fundido, janelas=janelas,
+                                   n_jobs=n_jobs, n_shards=n_shards, cache=cache,
+                                   colunas=colunas, cubo=cubo)
+
+    if cache is not None:
+        cache.limpar()
+
+    if compactar:
+        abts = {rotulo: compactar_abt(abt) for rotulo, abt in abts.items()}
+
+    if destino is not None:
+        for m1 in politicas:
+            salvar_abt(abts[rotulo_cutoff(m1)], usar_M_1=m1, destino=destino,
+                       formato=formato, particionar=particionar, compressao=compressao,
+                       tamanho_row_group=tamanho_row_group)
 
-    return abt
\ No newline at end of file
+    if not multiplas:
+        return abts[rotulo_cutoff(usar_M_1)]
+    if largo:
+        return juntar_abts(abts, chaves=df_inad.columns)
+    return abts
@@ -0,0 +1,213 @@
+import os
+import argparse
+
+import pandas as pd
+import numpy as np
+
+# Pasta padrão das bases sintéticas (data/synthetic na raiz, fora do controle de versão)
+PASTA_SINTETICOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "data", "synthetic")
+
+ESTADOS_CIVIS = np.array(["Solteiro", "Casado", "Divorciado", "Viuvo"])
+
+# Peso relativo de cada mês do ano no volume de transações (dez/nov mais
+# movimentados, fevereiro mais fraco) e de cada dia da semana (seg..dom)
+_SAZONALIDADE_MES = np.array([0.95, 0.85, 0.95, 0.95, 1.0, 0.95,
+                              1.0, 1.0, 0.95, 1.0, 1.15, 1.35])
+_PESO_DIA_SEMANA = np.array([1.0, 1.0, 1.0, 1.05, 1.2, 0.8, 0.55])
+
+
+def _formatar_datas(dias: np.ndarray) -> np.ndarray:
+    """Dias desde 1970 → texto 'dd/mm/aaaa' (formata só os dias distintos)."""
+    unicos, posicao = np.unique(dias, return_inverse=True)
+    textos = pd.to_datetime(unicos, unit="D").strftime("%d/%m/%Y").to_numpy()
+    return textos[posicao]
+
+
+def _gravar_csv(df: pd.DataFrame, caminho: str, primeiro: bool, **kwargs):
+    df.to_csv(caminho, sep=";", index=False, mode="w" if primeiro else "a",
+              header=primeiro, **kwargs)
+
+
+def _curva_dias(inicio: int, fim: int, crescimento: float) -> np.ndarray:
+    """
+    Distribuição acumulada do volume diário de transações em [inicio, fim]
+    (dias desde 1970): tendência de crescimento, sazonalidade mensal e efeito
+    do dia da semana.
+    """
+    dias = np.arange(inicio, fim + 1)
+    datas = pd.to_datetime(dias, unit="D")
+    t = (dias - inicio) / 365.0
+    peso = (np.exp(crescimento * t)
+            * _SAZONALIDADE_MES[datas.month.to_numpy() - 1]
+            * _PESO_DIA_SEMANA[datas.dayofweek.to_numpy()])
+    acumulado = np.concatenate([[0.0], np.cumsum(peso)])
+    return acumulado / acumulado[-1]
+
+
+def gerar_dados_sinteticos(diretorio: str,
+                           n_transacoes: int = 1_000_000,
+                           n_clientes: int = None,
+                           primeira_safra: str = "2023-09",
+                           n_safras: int = 24,
+                           meses_historico: int = 12,
+                           assimetria: float = 1.2,
+                           taxa_default: float = 0.10,
+                           seed: int = 42,
+                           tamanho_bloco: int = 2_000_000) -> dict:
+    """
+    Gera bases sintéticas no mesmo formato dos CSVs originais
+    (clientes_case.csv, inadimplencia_case.csv e transacoes_case.csv,
+    separados por ';', lidos por carregar_dados), em qualquer escala.
+
+    As bases são gravadas em blocos de `tamanho_bloco` linhas, de modo que a
+    memória não cresce com n_transacoes (só com n_clientes).
+
+    Características:
+    - transações por cliente com cauda longa (pesos log-normais com desvio
+      `assimetria`; ~5% dos clientes sem nenhuma transação);
+    - datas com tendência de crescimento, sazonalidade (pico em nov/dez),
+      menos movimento no fim de semana, início na abertura da conta e ~15%
+      dos clientes que deixam de transacionar (churn);
+    - valores log-normais ligados à renda do cliente, com outliers e ~0,5% nulos;
+    - cadastro com nulos em renda, score e estado civil, como na base original;
+    - inadimplência com `n_safras` safras mensais por cliente a partir de
+      `primeira_safra`, taxa de atraso ~`taxa_default` dependente do score,
+      alguns alvos nulos e o código 5 (tratado em preprocessar_inadimplencia).
+
+    Parâmetros
+    ----------
+    diretorio : pasta de saída (criada se não existir).
+    n_transacoes : total de linhas de transacoes_case.csv.
+    n_clientes : padrão n_transacoes // 10 (proporção da base original).
+    meses_historico : meses de transações antes da primeira safra.
+    seed : semente; os mesmos parâmetros geram exatamente os mesmos arquivos.
+
+    Retorna
+    -------
+    dict nome da base -> {"caminho", "linhas"}.
+    """
+    rng = np.random.default_rng(seed)
+    n_clientes = n_clientes or max(n_transacoes // 10, 1)
+    os.makedirs(diretorio, exist_ok=True)
+
+    largura = max(4, len(str(n_clientes)))
+    ids = np.char.add("C", np.char.zfill(np.arange(1, n_clientes + 1).astype(str), largura))
+
+    safra_0 = pd.Period(primeira_safra, freq="M")
+    safras = pd.period_range(safra_0, periods=n_safras, freq="M")
+    inicio_tx = (safra_0 - meses_historico).start_time
+    fim_tx = safras[-1].end_time.normalize()
+    dia_inicio = int(inicio_tx.value // 86_400_000_000_000)
+    dia_fim = int(fim_tx.value // 86_400_000_000_000)
+
+    # ---- Atributos latentes por cliente (usados por todas as bases)
+    fator_renda = rng.normal(0, 1, n_clientes).astype(np.float32)
+    score = np.clip(rng.normal(640, 190, n_clientes), 0, 1000).round().astype(np.int32)
+    abertura = rng.integers(dia_inicio - 20 * 365, dia_fim - 90, n_clientes).astype(np.int32)
+
+    peso = rng.lognormal(0, assimetria, n_clientes)
+    peso[rng.random(n_clientes) < 0.05] = 0.0
+    acumulado_clientes = np.cumsum(peso)
+    acumulado_clientes /= acumulado_clientes[-1]
+
+    curva = _curva_dias(dia_inicio, dia_fim, crescimento=0.15)
+    ativo_de = np.maximum(abertura, dia_inicio) - dia_inicio
+    ativo_ate = np.full(n_clientes, dia_fim - dia_inicio, dtype=np.int32)
+    churn = rng.random(n_clientes) < 0.15
+    ativo_ate[churn] = rng.integers(ativo_de[churn], dia_fim - dia_inicio + 1)
+
+    caminhos = {nome: os.path.join(diretorio, f"{nome}_case.csv")
+                for nome in ["clientes", "inadimplencia", "transacoes"]}
+    linhas = dict.fromkeys(caminhos, 0)
+
+    # ---- Clientes e inadimplência, em blocos de clientes
+    bloco_clientes = max(tamanho_bloco // max(n_safras, 1), 1)
+    for ini in range(0, n_clientes, bloco_clientes):
+        fim = min(ini + bloco_clientes, n_clientes)
+        n = fim - ini
+
+        renda = np.round(np.exp(8.6 + 0.8 * fator_renda[ini:fim]))
+        clientes = pd.DataFrame({
+            "id_cliente": ids[ini:fim],
+            "idade": rng.integers(18, 80, n),
+            "renda_mensal": pd.array(np.where(rng.random(n) < 0.025, np.nan, renda), dtype="Int64"),
+            "data_abertura_conta": _formatar_datas(abertura[ini:fim]),
+            "estado_civil": np.where(rng.random(n) < 0.16, None,
+                                     ESTADOS_CIVIS[rng.integers(0, 4, n)]),
+            "tempo_emprego_anos": np.round(rng.gamma(2.5, 6.0, n), 1),
+            "qtde_produtos": rng.integers(1, 6, n),
+            "score_interno": pd.array(np.where(rng.random(n) < 0.025, np.nan, score[ini:fim]),
+                                      dtype="Int64"),
+            "limite_credito": np.round(renda * rng.lognormal(1.0, 0.6, n)).astype(np.int64),
+        })
+        _gravar_csv(clientes, caminhos["clientes"], ini == 0, float_format="%.1f")
+        linhas["clientes"] += n
+
+        # probabilidade de atraso: logística no score, calibrada para ~taxa_default
+        z = -(score[ini:fim] - 640) / 190.0
+        logito = np.log(taxa_default / (1 - taxa_default)) - 0.5 + 1.2 * z
+        prob = np.repeat(1 / (1 + np.exp(-logito)), n_safras)
+        atraso = (rng.random(n * n_safras) < prob).astype(float)
+        sorteio = rng.random(n * n_safras)
+        atraso[sorteio < 0.002] = np.nan
+        atraso[(sorteio >= 0.002) & (sorteio < 0.003)] = 5
+        inad = pd.DataFrame({
+            "id_cliente": np.repeat(ids[ini:fim], n_safras),
+            "mes_safra": np.tile(safras.strftime("%Y-%m").to_numpy(), n),
+            "atraso_90d": pd.array(atraso, dtype="Int64"),
+        })
+        _gravar_csv(inad, caminhos["inadimplencia"], ini == 0)
+        linhas["inadimplencia"] += len(inad)
+
+    # ---- Transações, em blocos de linhas (ordem aleatória, como a original)
+    for ini in range(0, max(n_transacoes, 1), tamanho_bloco):
+        n = min(tamanho_bloco, n_transacoes - ini)
+        if n <= 0:
+            break
+
+        cliente = np.minimum(np.searchsorted(acumulado_clientes, rng.random(n), side="right"),
+                             n_clientes - 1)
+
+        # data: inversa da curva diária restrita ao período ativo do cliente
+        lo = curva[ativo_de[cliente]]
+        hi = curva[ativo_ate[cliente] + 1]
+        u = lo + rng.random(n) * (hi - lo)
+        dia = np.clip(np.searchsorted(curva, u, side="right") - 1, 0, len(curva) - 2)
+
+        valor = np.exp(np.log(2500) + 0.35 * fator_renda[cliente] + rng.normal(0, 0.8, n))
+        outlier = rng.random(n) < 0.002
+        valor[outlier] *= rng.uniform(10, 60, outlier.sum())
+        valor = np.round(np.maximum(valor, 10.0), 2)
+        valor[rng.random(n) < 0.005] = np.nan
+
+        transacoes = pd.DataFrame({
+            "id_cliente": ids[cliente],
+            "valor_transacao": valor,
+            "data_transacao": _formatar_datas(dia + dia_inicio),
+        })
+        _gravar_csv(transacoes, caminhos["transacoes"], ini == 0, float_format="%.2f")
+        linhas["transacoes"] += n
+
+    return {nome: {"caminho": caminhos[nome], "linhas": linhas[nome]} for nome in caminhos}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Gera bases sintéticas no formato dos CSVs originais do case.")
+    parser.add_argument("--destino", default=PASTA_SINTETICOS)
+    parser.add_argument("--n-transacoes", type=float, default=1e6)
+    parser.add_argument("--n-clientes", type=int, default=None)
+    parser.add_argument("--n-safras", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    geradas = gerar_dados_sinteticos(args.destino, n_transacoes=int(args.n_transacoes),
+                                     n_clientes=args.n_clientes, n_safras=args.n_safras,
+                                     seed=args.seed)
+    for nome, info in geradas.items():
+        print(f"{nome}: {info['linhas']} linhas em {info['caminho']}")
+
+
+if __name__ == "__main__":
+    main()
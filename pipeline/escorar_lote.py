@@ -0,0 +1,248 @@
+import os
+import glob
+import time
+import pickle
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from features.indice_transacoes import IndiceTransacoes
+from pipeline.carregar_dados import carregar_dados
+from pipeline.preprocess import (preprocessar_clientes, preprocessar_inadimplencia,
+                                 preprocessar_transacoes)
+from pipeline.criar_abt import CHAVES_ABT, montar_abt
+
+# Incrementar quando o formato do artefato do modelo mudar
+VERSAO_ARTEFATO = 1
+
+# CSVs originais (data/raw na raiz), independente do diretório de trabalho
+PASTA_DADOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "data", "raw")
+
+
+def salvar_modelo(modelo, caminho, colunas=None, usar_M_1=True, janelas=None) -> str:
+    """
+    Persiste o modelo treinado junto com o que é preciso para escorá-lo fora
+    do notebook: as colunas de entrada (na ordem de treino), a política de
+    cutoff e a especificação de janelas da ABT.
+
+    colunas : por padrão, lidas do próprio modelo (feature_names_in_ do
+        scikit-learn ou feature_names_ do CatBoost/LightGBM).
+    """
+    if colunas is None:
+        colunas = getattr(modelo, "feature_names_in_", None)
+        if colunas is None:
+            colunas = getattr(modelo, "feature_names_", None)
+        if colunas is None:
+            raise ValueError("salvar_modelo: informe as colunas de entrada do modelo.")
+
+    artefato = {
+        "versao": VERSAO_ARTEFATO,
+        "modelo": modelo,
+        "colunas": [str(c) for c in colunas],
+        "usar_M_1": bool(usar_M_1),
+        "janelas": janelas,
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "wb") as f:
+        pickle.dump(artefato, f)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def carregar_modelo(caminho) -> dict:
+    """Lê o artefato gravado por salvar_modelo."""
+    with open(caminho, "rb") as f:
+        artefato = pickle.load(f)
+    if artefato.get("versao") != VERSAO_ARTEFATO:
+        raise ValueError(f"carregar_modelo: versão de artefato não suportada em {caminho}.")
+    return artefato
+
+
+def _preparar_chaves(lote: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza um lote de chaves: id_cliente como texto e data_referencia como
+    data. Sem data_referencia, ela é derivada de mes_safra ('YYYY-MM') como
+    em preprocessar_inadimplencia (último dia do mês).
+    """
+    chaves = pd.DataFrame({"id_cliente": lote["id_cliente"].astype(str).to_numpy()})
+    if "data_referencia" in lote.columns:
+        chaves["data_referencia"] = pd.to_datetime(lote["data_referencia"]).to_numpy()
+    else:
+        mes = pd.to_datetime(lote["mes_safra"].astype(str), format="%Y-%m")
+        chaves["data_referencia"] = (mes + pd.offsets.MonthEnd(0)).to_numpy()
+    return chaves
+
+
+def ler_chaves_em_lotes(origem, tamanho_lote: int = 100_000):
+    """
+    Gerador de lotes de chaves (id_cliente, data_referencia) a escorar.
+
+    origem : DataFrame, ou caminho de um CSV (separador ';') ou Parquet com
+        id_cliente e data_referencia (ou mes_safra). Os arquivos são lidos em
+        blocos de `tamanho_lote` linhas, sem carregar a base inteira.
+    """
+    if isinstance(origem, pd.DataFrame):
+        for inicio in range(0, len(origem), tamanho_lote):
+            yield _preparar_chaves(origem.iloc[inicio:inicio + tamanho_lote])
+        return
+
+    if str(origem).endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        arquivo = pq.ParquetFile(origem)
+        colunas = [c for c in ["id_cliente", "data_referencia", "mes_safra"]
+                   if c in arquivo.schema_arrow.names]
+        for lote in arquivo.iter_batches(batch_size=tamanho_lote, columns=colunas):
+            yield _preparar_chaves(lote.to_pandas())
+        return
+
+    for lote in pd.read_csv(origem, sep=";", chunksize=tamanho_lote, dtype={"id_cliente": str}):
+        yield _preparar_chaves(lote)
+
+
+# Estado de cada processo do pool: bases e modelo são enviados uma única vez,
+# na inicialização do processo, e não a cada lote
+_ESTADO = {}
+
+
+def _iniciar_processo(df_clientes, df_tx, artefato, destino):
+    _ESTADO.update(df_clientes=df_clientes, df_tx=df_tx, artefato=artefato,
+                   destino=destino)
+
+
+def _escorar(df_clientes, df_tx, artefato, chaves) -> pd.DataFrame:
+    """Features (só as colunas do modelo) e score de um lote de chaves."""
+    abt = montar_abt(df_clientes, chaves, df_tx, usar_M_1=artefato["usar_M_1"],
+                     janelas=artefato["janelas"], colunas=artefato["colunas"])
+    scores = chaves.copy()
+    scores["score"] = artefato["modelo"].predict_proba(abt[artefato["colunas"]])[:, 1]
+    return scores
+
+
+def _gravar_parte(scores: pd.DataFrame, destino: str, numero: int) -> str:
+    caminho = os.path.join(destino, f"parte-{numero:05d}.parquet")
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    scores.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def _escorar_lote(args):
+    numero, chaves = args
+    scores = _escorar(_ESTADO["df_clientes"], _ESTADO["df_tx"], _ESTADO["artefato"], chaves)
+    _gravar_parte(scores, _ESTADO["destino"], numero)
+    return len(scores)
+
+
+def escorar_em_lotes(df_clientes, df_tx, chaves, modelo, destino,
+                     tamanho_lote: int = 100_000, n_jobs: int = 1, verbose: bool = False) -> dict:
+    """
+    Escoragem em lote: percorre as chaves (id_cliente, data_referencia) em
+    lotes, calcula só as features usadas pelo modelo (ver montar_abt com
+    `colunas`), aplica o modelo persistido e grava os scores de cada lote
+    assim que ficam prontos, como <destino>/parte-NNNNN.parquet
+    (id_cliente, data_referencia, score, na ordem das chaves).
+
+    Parâmetros
+    ----------
+    df_clientes, df_tx : bases pré-processadas (df_tx pode ser um
+        IndiceTransacoes; o índice é construído uma única vez por processo).
+    chaves : origem das chaves (ver ler_chaves_em_lotes).
+    modelo : artefato (dict de carregar_modelo) ou caminho do arquivo.
+    destino : diretório de saída; partes de execuções anteriores são removidas.
+    n_jobs : processos do pool (-1 = todos os núcleos). Com n_jobs > 1, até
+        2 * n_jobs lotes ficam em processamento ao mesmo tempo.
+    verbose : imprime o progresso a cada lote.
+
+    Retorna
+    -------
+    dict com linhas, lotes, segundos e linhas_por_s.
+    """
+    artefato = carregar_modelo(modelo) if isinstance(modelo, (str, os.PathLike)) else modelo
+    n_jobs = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+
+    inicio = time.perf_counter()
+
+    if not isinstance(df_tx, IndiceTransacoes):
+        df_tx = IndiceTransacoes(df_tx)
+
+    os.makedirs(destino, exist_ok=True)
+    for antigo in glob.glob(os.path.join(destino, "parte-*.parquet")):
+        os.remove(antigo)
+
+    resumo = {"linhas": 0, "lotes": 0}
+
+    def registrar(n_linhas):
+        resumo["linhas"] += n_linhas
+        resumo["lotes"] += 1
+        if verbose:
+            decorrido = time.perf_counter() - inicio
+            print(f"lote {resumo['lotes']}: {resumo['linhas']} linhas "
+                  f"({resumo['linhas'] / decorrido:,.0f} linhas/s)")
+
+    lotes = enumerate(ler_chaves_em_lotes(chaves, tamanho_lote))
+
+    if n_jobs == 1:
+        for numero, lote in lotes:
+            scores = _escorar(df_clientes, df_tx, artefato, lote)
+            _gravar_parte(scores, destino, numero)
+            registrar(len(scores))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_iniciar_processo,
+                                 initargs=(df_clientes, df_tx, artefato, destino)) as pool:
+            pendentes = deque()
+            for tarefa in lotes:
+                pendentes.append(pool.submit(_escorar_lote, tarefa))
+                if len(pendentes) >= 2 * n_jobs:
+                    registrar(pendentes.popleft().result())
+            while pendentes:
+                registrar(pendentes.popleft().result())
+
+    segundos = time.perf_counter() - inicio
+    resumo["segundos"] = round(segundos, 3)
+    resumo["linhas_por_s"] = round(resumo["linhas"] / segundos, 1) if segundos > 0 else None
+    return resumo
+
+
+def ler_scores(destino) -> pd.DataFrame:
+    """Junta as partes gravadas por escorar_em_lotes, na ordem das chaves."""
+    partes = sorted(glob.glob(os.path.join(destino, "parte-*.parquet")))
+    if not partes:
+        return pd.DataFrame(columns=CHAVES_ABT + ["score"])
+    return pd.concat([pd.read_parquet(p) for p in partes], ignore_index=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Escoragem em lote do modelo de PD sobre pares (id_cliente, data_referencia).")
+    parser.add_argument("--modelo", required=True, help="artefato gravado com salvar_modelo")
+    parser.add_argument("--saida", required=True, help="diretório das partes Parquet de scores")
+    parser.add_argument("--chaves", default=None,
+                        help="CSV (';') ou Parquet com id_cliente e data_referencia/mes_safra; "
+                             "por padrão, as chaves de inadimplencia_case.csv")
+    parser.add_argument("--dados", default=PASTA_DADOS, help="diretório dos CSVs originais")
+    parser.add_argument("--tamanho-lote", type=int, default=100_000)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    dados = carregar_dados(args.dados)
+    df_clientes = preprocessar_clientes(dados["clientes"])
+    df_tx = preprocessar_transacoes(dados["transacoes"])
+    chaves = args.chaves
+    if chaves is None:
+        chaves = preprocessar_inadimplencia(dados["inadimplencia"])[CHAVES_ABT]
+
+    resumo = escorar_em_lotes(df_clientes, df_tx, chaves, args.modelo, args.saida,
+                              tamanho_lote=args.tamanho_lote, n_jobs=args.n_jobs,
+                              verbose=True)
+    print(f"{resumo['linhas']} linhas em {resumo['segundos']}s "
+          f"({resumo['linhas_por_s']:,.0f} linhas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import re
+
+import pandas as pd
+import numpy as np
+
+# Esquema compacto da ABT: (padrão do nome da coluna, dtype). Vale a primeira
+# regra cujo padrão casa com o nome inteiro; colunas sem regra não mudam.
+# - flags 0/1/NaN e inteiros pequenos → inteiros anuláveis (Int8/16/32)
+# - contagens de transações e de dias → Int16 (valores fora do intervalo
+#   passam para o próximo inteiro, ver _converter)
+# - valores monetários, razões e percentuais → float32 (precisão usada
+#   internamente pelos modelos de árvore/CatBoost)
+# - textos de baixa cardinalidade → category
+ESQUEMA_ABT = [
+    (r"atraso_90d", "Int8"),
+    (r"id_cliente|mes_safra|estado_civil|mes_abertura_conta", "category"),
+    (r"idade|qtde_produtos", "Int8"),
+    (r"idade2|score_interno", "Int16"),
+    (r"limite_credito", "Int32"),
+    (r"renda_mensal|tempo_emprego_anos|tempo_relacionamento_anos|log_renda"
+     r"|renda_por_limite", "float32"),
+    (r"flag_.*", "Int8"),
+    (r"(qtde_trans|delta_qtde)_.*", "Int16"),
+    (r"tempo_(desde_primeira|desde_ultima|atividade)_.*", "Int16"),
+    (r"(vlr_trans|delta_vlr|comp_vlr|comp_qtde|perc_janela_coberta|pct_qtde_trans)_.*",
+     "float32"),
+]
+
+# Família de origem de cada coluna (para o relatório de memória); colunas sem
+# regra são cadastrais (features_clientes)
+FAMILIAS_ABT = [
+    ("chaves", r"id_cliente|mes_safra|data_referencia|atraso_90d"),
+    ("valor", r"(vlr_trans|comp_vlr|delta_vlr|flag_completo|perc_janela_coberta)_.*"
+              r"|flag_cliente_novo"),
+    ("quantidade", r"(qtde_trans|pct_qtde_trans|comp_qtde|delta_qtde)_.*"),
+    ("tempo", r"tempo_(desde_primeira|desde_ultima|atividade)_.*"),
+    ("flags", r"flag_transacao_.*|flag_nunca_transacionou"),
+]
+
+
+def tipo_coluna(coluna: str, esquema=ESQUEMA_ABT):
+    """dtype declarado para a coluna no esquema (None se não houver regra)."""
+    for padrao, tipo in esquema:
+        if re.fullmatch(padrao, coluna):
+            return tipo
+    return None
+
+
+def familia_coluna(coluna: str) -> str:
+    """Família de features de origem da coluna."""
+    for familia, padrao in FAMILIAS_ABT:
+        if re.fullmatch(padrao, coluna):
+            return familia
+    return "clientes"
+
+
+# Inteiros anuláveis em ordem de largura (fallback de _converter)
+_INTEIROS = ["Int8", "Int16", "Int32", "Int64"]
+
+
+def _converter(serie: pd.Series, tipo: str):
+    """
+    Converte a série para o dtype declarado. Para inteiros, usa o tipo
+    declarado ou, se algum valor não couber nele (ex.: cliente com mais de
+    32767 transações em um Int16), o próximo inteiro anulável em que todos
+    caibam. Se houver valores não inteiros, retorna None (a coluna fica como
+    está).
+    """
+    if tipo == "category" or tipo.startswith("float"):
+        return serie.astype(tipo)
+
+    valores = pd.to_numeric(serie, errors="coerce").dropna().to_numpy(dtype=float)
+    if len(valores) and not np.array_equal(valores, np.round(valores)):
+        return None
+    for candidato in _INTEIROS[_INTEIROS.index(tipo):]:
+        limites = np.iinfo(candidato.lower())
+        if not len(valores) or (valores.min() >= limites.min
+                                and valores.max() <= limites.max):
+            return serie.astype(candidato)
+    return None
+
+
+def compactar_abt(abt: pd.DataFrame, esquema=ESQUEMA_ABT) -> pd.DataFrame:
+    """
+    Aplica o esquema compacto às colunas da ABT, retornando um novo DataFrame.
+    Colunas inteiras cujos valores não cabem no tipo declarado (ex.: contagem
+    acima de Int16) passam para o próximo inteiro anulável; colunas com
+    valores não inteiros mantêm o dtype original.
+    """
+    colunas = {}
+    for coluna in abt.columns:
+        tipo = tipo_coluna(coluna, esquema)
+        convertida = _converter(abt[coluna], tipo) if tipo is not None else None
+        colunas[coluna] = abt[coluna] if convertida is None else convertida
+
+    return pd.DataFrame(colunas, index=abt.index)
+
+
+def relatorio_memoria(abt: pd.DataFrame, compacta: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Memória ocupada pela ABT por família de features, antes e depois do
+    esquema compacto (calculado com compactar_abt se `compacta` não for dada).
+
+    Retorna DataFrame com familia, n_colunas, mb_original, mb_compacto e
+    reducao (mb_original / mb_compacto), com uma linha final de total.
+    """
+    if compacta is None:
+        compacta = compactar_abt(abt)
+
+    original = abt.memory_usage(deep=True, index=False)
+    compacto = compacta.memory_usage(deep=True, index=False)
+
+    resumo = pd.DataFrame({
+        "familia": [familia_coluna(c) for c in abt.columns],
+        "mb_original": original.to_numpy() / 1024 ** 2,
+        "mb_compacto": compacto[abt.columns].to_numpy() / 1024 ** 2,
+    })
+    resumo = (resumo.groupby("familia", sort=False)
+              .agg(n_colunas=("familia", "size"),
+                   mb_original=("mb_original", "sum"),
+                   mb_compacto=("mb_compacto", "sum"))
+              .reset_index())
+
+    total = pd.DataFrame({"familia": ["total"],
+                          "n_colunas": [resumo["n_colunas"].sum()],
+                          "mb_original": [resumo["mb_original"].sum()],
+                          "mb_compacto": [resumo["mb_compacto"].sum()]})
+    resumo = pd.concat([resumo, total], ignore_index=True)
+    resumo["reducao"] = (resumo["mb_original"] / resumo["mb_compacto"]).round(2)
+
+    return resumo.round({"mb_original": 3, "mb_compacto": 3})
@@ -0,0 +1,224 @@
+import os
+import json
+import glob
+import shutil
+import argparse
+
+import pandas as pd
+
+from pipeline.carregar_dados import ESQUEMA_CSV, opcoes_csv, nulos_como_nan
+from pipeline.preprocess import preprocessar_transacoes
+from pipeline.criar_abt import gravar_abt_particionada, ler_abt_particionada
+from pipeline.instrumentacao import etapa
+
+# Pasta padrão do dataset de transações (data/processed/transacoes na raiz)
+PASTA_TRANSACOES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "data", "processed", "transacoes")
+
+# Registro das ingestões feitas em um dataset (arquivos de origem já lidos)
+_MANIFESTO = "_ingestao.json"
+
+
+def _ler_manifesto(diretorio) -> list:
+    caminho = os.path.join(diretorio, _MANIFESTO)
+    if not os.path.exists(caminho):
+        return []
+    with open(caminho) as f:
+        return json.load(f)
+
+
+def _gravar_manifesto(diretorio, entradas):
+    caminho = os.path.join(diretorio, _MANIFESTO)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w") as f:
+        json.dump(entradas, f, indent=1)
+    os.replace(temporario, caminho)
+
+
+def _partes(diretorio, prefixo, execucao):
+    return glob.glob(os.path.join(diretorio, "mes_safra=*", f"{prefixo}-{execucao}-*"))
+
+
+def _mover_preparo(diretorio, preparo):
+    """
+    Move as partes da pasta de preparo para as partições do dataset com o
+    prefixo "_parte" (ignorado pelos leitores até a troca ser concluída).
+    """
+    if not os.path.isdir(preparo):  # arquivo sem linhas
+        return
+    for particao in sorted(os.listdir(preparo)):
+        if not particao.startswith("mes_safra="):
+            continue
+        destino = os.path.join(diretorio, particao)
+        os.makedirs(destino, exist_ok=True)
+        for parte in os.listdir(os.path.join(preparo, particao)):
+            os.replace(os.path.join(preparo, particao, parte),
+                       os.path.join(destino, f"_{parte}"))
+    os.replace(os.path.join(preparo, "_colunas.json"), os.path.join(diretorio, "_colunas.json"))
+
+
+def _concluir_trocas(diretorio):
+    """
+    Conclui as trocas pendentes do dataset (entradas do manifesto com
+    "substitui", gravadas antes de qualquer parte antiga ser removida):
+    remove as partes das execuções substituídas, publica as novas
+    ("_parte-*" → "parte-*") e limpa o marcador. Cada passo pode ser repetido,
+    então uma troca interrompida é terminada na próxima ingestão ou leitura.
+    Partes "_parte-*" sem troca pendente (falha antes do manifesto) são
+    descartadas.
+    """
+    manifesto = _ler_manifesto(diretorio)
+    pendentes = [e for e in manifesto if "substitui" in e]
+
+    for entrada in pendentes:
+        for execucao in entrada["substitui"]:
+            for antiga in _partes(diretorio, "parte", execucao):
+                os.remove(antiga)
+        for nova in _partes(diretorio, "_parte", entrada["execucao"]):
+            pasta, nome = os.path.split(nova)
+            os.replace(nova, os.path.join(pasta, nome[1:]))
+
+    for pasta in glob.glob(os.path.join(diretorio, "mes_safra=*")):
+        for orfa in glob.glob(os.path.join(pasta, "_parte-*")):
+            os.remove(orfa)
+        if not os.listdir(pasta):
+            os.rmdir(pasta)
+
+    if pendentes:
+        for entrada in pendentes:
+            del entrada["substitui"]
+        _gravar_manifesto(diretorio, manifesto)
+
+
+def ler_csv_em_blocos(caminho, tamanho_bloco_mb: float = 16):
+    """
+    Gerador de blocos do CSV de transações (DataFrames brutos, como os de
+    carregar_dados), lidos em sequência pelo leitor do pyarrow com
+    `tamanho_bloco_mb` MB de texto por bloco.
+    """
+    import pyarrow.csv as pa_csv
+
+    leitor = pa_csv.open_csv(
+        caminho,
+        read_options=pa_csv.ReadOptions(block_size=int(tamanho_bloco_mb * 1024 ** 2)),
+        **opcoes_csv(ESQUEMA_CSV["transacoes"]),
+    )
+    for lote in leitor:
+        if lote.num_rows:
+            yield nulos_como_nan(lote.to_pandas())
+
+
+def ingerir_transacoes(caminho_csv, diretorio, tamanho_bloco_mb: float = 16,
+                       forcar: bool = False) -> dict:
+    """
+    Ingestão em streaming de um CSV de transações (formato de
+    transacoes_case.csv) para um dataset Parquet particionado por mes_safra
+    (<diretorio>/mes_safra=AAAA-MM/parte-<execucao>-<bloco>.parquet).
+
+    Cada bloco do arquivo passa por preprocessar_transacoes (id como texto,
+    data, mes_safra e valor numérico) e é acrescentado às partições dos seus
+    meses; o arquivo nunca é carregado inteiro em memória. Transações sem
+    data válida ficam na partição mes_safra=NaT.
+
+    Novos arquivos (ex.: a carga de cada mês) são acrescentados ao dataset.
+    Um arquivo já ingerido (mesmo caminho, tamanho e mtime, ver _ingestao.json)
+    é ignorado, a menos que forcar=True. Um arquivo já ingerido que mudou (ex.:
+    cresceu) ou forçado substitui as suas partes anteriores, sem duplicar
+    linhas, e mantém a sua posição na ordem de leitura.
+
+    As partes são gravadas primeiro em uma pasta de preparo dentro do dataset
+    e só trocadas pelas anteriores ao final: as novas entram com nomes
+    ignorados pelos leitores, o manifesto registra a troca pendente e só então
+    as antigas são removidas (ver _concluir_trocas). Uma falha antes do
+    manifesto deixa o dataset como estava; depois dele, a troca é concluída na
+    próxima ingestão ou leitura. Nenhuma linha se perde nem é duplicada.
+
+    Retorna dict com linhas, blocos, meses (partições tocadas) e ignorado.
+    """
+    info = os.stat(caminho_csv)
+    origem = {"origem": os.path.abspath(caminho_csv), "tamanho": info.st_size,
+              "mtime_ns": info.st_mtime_ns}
+
+    os.makedirs(diretorio, exist_ok=True)
+    _concluir_trocas(diretorio)
+    manifesto = _ler_manifesto(diretorio)
+    ja_ingerido = any(all(e.get(k) == v for k, v in origem.items()) for e in manifesto)
+    if ja_ingerido and not forcar:
+        return {"linhas": 0, "blocos": 0, "meses": [], "ignorado": True}
+
+    # ingestões anteriores do mesmo arquivo: as suas partes serão substituídas
+    anteriores = [e for e in manifesto if e.get("origem") == origem["origem"]]
+
+    # nomes ordenáveis: a leitura segue a ordem das execuções e dos blocos; um
+    # arquivo reingerido ganha uma execução nova prefixada pela da primeira
+    # ingestão ("<ordem>r<agora>"), mantendo a sua posição na leitura
+    agora = pd.Timestamp.now().strftime("%Y%m%dT%H%M%S%f")
+    ordem = min((e.get("ordem", e["execucao"]) for e in anteriores), default=agora)
+    execucao = agora if ordem == agora else f"{ordem}r{agora}"
+
+    preparo = os.path.join(diretorio, f"_preparo-{os.getpid()}")
+    shutil.rmtree(preparo, ignore_errors=True)
+    linhas, blocos, meses = 0, 0, set()
+    try:
+        for numero, bruto in enumerate(ler_csv_em_blocos(caminho_csv, tamanho_bloco_mb)):
+            with etapa("ingerir_bloco", linhas_entrada=len(bruto)):
+                bloco = preprocessar_transacoes(bruto)
+                gravar_abt_particionada(bloco, preparo, particao="mes_safra",
+                                        arquivo=f"parte-{execucao}-{numero:06d}.parquet")
+            linhas += len(bloco)
+            blocos += 1
+            meses.update(bloco["mes_safra"].unique())
+
+        _mover_preparo(diretorio, preparo)
+
+        manifesto = [e for e in manifesto if e.get("origem") != origem["origem"]]
+        manifesto.append({**origem, "execucao": execucao, "ordem": ordem, "linhas": linhas,
+                          "substitui": [e["execucao"] for e in anteriores]})
+        _gravar_manifesto(diretorio, manifesto)
+    finally:
+        shutil.rmtree(preparo, ignore_errors=True)
+
+    _concluir_trocas(diretorio)
+
+    return {"linhas": linhas, "blocos": blocos, "meses": sorted(meses), "ignorado": False}
+
+
+def ler_transacoes(diretorio, meses=None, colunas=None) -> pd.DataFrame:
+    """
+    Lê o dataset gravado por ingerir_transacoes como o DataFrame de
+    preprocessar_transacoes (mesmas colunas e tipos).
+
+    meses : lista opcional de mes_safra a ler (ex.: só o histórico necessário).
+    colunas : lista opcional de colunas.
+
+    As linhas ficam agrupadas por mês, na ordem de ingestão dentro de cada
+    mês; transações do mesmo cliente no mesmo dia mantêm a ordem do arquivo,
+    então as features (inclusive desempates por data) não mudam. Uma troca de
+    partes interrompida (ver ingerir_transacoes) é concluída antes da leitura.
+    """
+    _concluir_trocas(diretorio)
+    return ler_abt_particionada(diretorio, particao="mes_safra", valores=meses,
+                                colunas=colunas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Ingestão em blocos de transacoes_case.csv para Parquet particionado por mes_safra.")
+    parser.add_argument("csv", nargs="+", help="arquivo(s) de transações (';')")
+    parser.add_argument("--destino", default=PASTA_TRANSACOES)
+    parser.add_argument("--tamanho-bloco-mb", type=float, default=16)
+    parser.add_argument("--forcar", action="store_true",
+                        help="reingere arquivos já registrados em _ingestao.json (substitui as suas partes)")
+    args = parser.parse_args(argv)
+
+    for caminho in args.csv:
+        resumo = ingerir_transacoes(caminho, args.destino, args.tamanho_bloco_mb, args.forcar)
+        if resumo["ignorado"]:
+            print(f"{caminho}: já ingerido (use --forcar para repetir)")
+        else:
+            print(f"{caminho}: {resumo['linhas']} linhas em {resumo['blocos']} blocos, "
+                  f"{len(resumo['meses'])} meses")
+
+
+if __name__ == "__main__":
+    main()
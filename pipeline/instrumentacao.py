@@ -0,0 +1,277 @@
+import os
+import sys
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from features.indice_transacoes import IndiceTransacoes
+
+# Configuração da instrumentação (desligada por padrão). Também pode ser
+# ligada sem alterar código pelas variáveis de ambiente PD_INSTRUMENTACAO
+# (arquivo JSON lines), PD_PERFILAR (etapa) e PD_PERFILADOR.
+_CONFIG = {"arquivo": None, "perfilar": None, "perfilador": "cprofile"}
+_LOCAL = threading.local()
+_TRAVA = threading.Lock()
+# etapas ativas em todas as threads: o pico de memória é do processo, então
+# só pode ser zerado quando nenhuma outra thread está medindo uma etapa
+_ATIVAS = {"n": 0}
+_TRAVA_ATIVAS = threading.Lock()
+
+PERFILADORES = ("cprofile", "tracemalloc")
+
+
+def zerar_pico_rss() -> bool:
+    """Reinicia o pico de memória residente do processo (Linux)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _status_mb(campo: str):
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith(campo):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def pico_rss_mb() -> float:
+    """Pico de memória residente (MB) desde o último zerar_pico_rss."""
+    pico = _status_mb("VmHWM:")
+    if pico is not None:
+        return pico
+    import resource
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 ** 2 if sys.platform == "darwin" else pico / 1024
+
+
+def rss_mb() -> float:
+    """Memória residente atual (MB); sem /proc, usa o pico do processo."""
+    atual = _status_mb("VmRSS:")
+    return atual if atual is not None else pico_rss_mb()
+
+
+def ativar_instrumentacao(arquivo: str, perfilar: str = None, perfilador: str = "cprofile"):
+    """
+    Liga a instrumentação: cada etapa do pipeline passa a gravar um registro
+    por execução em `arquivo` (JSON lines), com etapa, etapa_pai, linhas de
+    entrada e saída, tempo de parede, tempo de CPU e delta do pico de memória.
+
+    perfilar : nome de uma etapa a perfilar (ex.: "features_transacionais").
+    perfilador : "cprofile" (grava <arquivo>.<etapa>.<n>.prof, abrível com
+        pstats/snakeviz) ou "tracemalloc" (grava as 25 linhas que mais
+        alocaram em <arquivo>.<etapa>.<n>.txt).
+    """
+    if perfilador not in PERFILADORES:
+        raise ValueError(f"perfilador inválido: {perfilador!r} (use {PERFILADORES}).")
+    os.makedirs(os.path.dirname(os.path.abspath(arquivo)), exist_ok=True)
+    _CONFIG.update(arquivo=arquivo, perfilar=perfilar, perfilador=perfilador)
+
+
+def desativar_instrumentacao():
+    """Desliga a instrumentação."""
+    _CONFIG.update(arquivo=None, perfilar=None, perfilador="cprofile")
+
+
+@contextmanager
+def instrumentacao(arquivo: str, perfilar: str = None, perfilador: str = "cprofile"):
+    """Liga a instrumentação dentro de um bloco `with`."""
+    anterior = dict(_CONFIG)
+    ativar_instrumentacao(arquivo, perfilar, perfilador)
+    try:
+        yield
+    finally:
+        _CONFIG.update(anterior)
+
+
+def instrumentacao_ativa() -> bool:
+    return _CONFIG["arquivo"] is not None
+
+
+def contar_linhas(objeto):
+    """Linhas de um DataFrame/Series/índice (ou soma de um dict deles); None se não se aplica."""
+    if isinstance(objeto, dict):
+        contagens = [contar_linhas(v) for v in objeto.values()]
+        contagens = [c for c in contagens if c is not None]
+        return sum(contagens) if contagens else None
+    if isinstance(objeto, (pd.DataFrame, pd.Series, IndiceTransacoes)):
+        return len(objeto)
+    return None
+
+
+def _gravar(registro: dict):
+    linha = json.dumps(registro, ensure_ascii=False, default=str) + "\n"
+    with _TRAVA, open(_CONFIG["arquivo"], "a") as f:
+        f.write(linha)
+
+
+def _caminho_perfil(nome: str, extensao: str) -> str:
+    return f"{_CONFIG['arquivo']}.{nome}.{os.getpid()}-{time.time_ns()}.{extensao}"
+
+
+def na_etapa_atual(funcao):
+    """
+    Envolve `funcao` para rodar em outra thread (ex.: ThreadPoolExecutor) como
+    filha da etapa atual: as etapas abertas lá registram essa etapa_pai.
+    """
+    pilha = getattr(_LOCAL, "pilha", None)
+    pai = pilha[-1]["etapa"] if pilha else getattr(_LOCAL, "pai_externo", None)
+
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+        anterior = getattr(_LOCAL, "pai_externo", None)
+        _LOCAL.pai_externo = pai
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            _LOCAL.pai_externo = anterior
+
+    return envolvida
+
+
+@contextmanager
+def etapa(nome: str, linhas_entrada=None, **extras):
+    """
+    Mede um trecho do pipeline como uma etapa. Desligada, não faz nada.
+
+    Produz o dict do registro, para o chamador informar linhas_saida ou
+    outros campos:
+
+        with etapa("concatenar_abt", linhas_entrada=len(df_inad)) as registro:
+            abt = pd.concat(...)
+            registro["linhas_saida"] = len(abt)
+
+    Etapas aninhadas registram a etapa_pai; o pico de memória da etapa pai
+    inclui o das filhas. Em threads, a etapa_pai vem de na_etapa_atual e o
+    pico só é zerado quando não há etapas ativas em outras threads; enquanto
+    houver, delta_pico_mb usa o pico do processo sem zerá-lo (pode incluir
+    memória das etapas paralelas).
+    """
+    if _CONFIG["arquivo"] is None:
+        yield {}
+        return
+
+    pilha = getattr(_LOCAL, "pilha", None)
+    if pilha is None:
+        pilha = _LOCAL.pilha = []
+
+    with _TRAVA_ATIVAS:
+        zerar = _ATIVAS["n"] == len(pilha)
+        _ATIVAS["n"] += 1
+
+    # o pico acumulado até aqui pertence à etapa pai, pois o contador é zerado
+    if pilha and zerar:
+        pilha[-1]["_pico"] = max(pilha[-1]["_pico"], pico_rss_mb())
+
+    pai = pilha[-1]["etapa"] if pilha else getattr(_LOCAL, "pai_externo", None)
+    registro = {"etapa": nome, "etapa_pai": pai,
+                "linhas_entrada": linhas_entrada, "linhas_saida": None, **extras}
+    contexto = {"etapa": nome, "_pico": 0.0}
+    pilha.append(contexto)
+
+    perfilar = _CONFIG["perfilar"] == nome
+    perfilador = _CONFIG["perfilador"]
+    if perfilar and perfilador == "cprofile":
+        import cProfile
+        perfil = cProfile.Profile()
+    elif perfilar:
+        import tracemalloc
+        tracemalloc.start()
+
+    rss_inicio = rss_mb()
+    if zerar:
+        zerar_pico_rss()
+    inicio, cpu_inicio = time.perf_counter(), time.process_time()
+    if perfilar and perfilador == "cprofile":
+        perfil.enable()
+    try:
+        yield registro
+    except BaseException as erro:
+        registro["erro"] = f"{type(erro).__name__}: {erro}"
+        raise
+    finally:
+        if perfilar and perfilador == "cprofile":
+            perfil.disable()
+        registro["segundos"] = round(time.perf_counter() - inicio, 6)
+        registro["cpu_segundos"] = round(time.process_time() - cpu_inicio, 6)
+        pico = max(contexto["_pico"], pico_rss_mb())
+        registro["delta_pico_mb"] = round(pico - rss_inicio, 1)
+        pilha.pop()
+        with _TRAVA_ATIVAS:
+            _ATIVAS["n"] -= 1
+        if pilha:
+            pilha[-1]["_pico"] = max(pilha[-1]["_pico"], pico)
+
+        if perfilar and perfilador == "cprofile":
+            registro["perfil"] = _caminho_perfil(nome, "prof")
+            perfil.dump_stats(registro["perfil"])
+        elif perfilar:
+            registro["tracemalloc_pico_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 ** 2, 1)
+            registro["perfil"] = _caminho_perfil(nome, "txt")
+            estatisticas = tracemalloc.take_snapshot().statistics("lineno")[:25]
+            tracemalloc.stop()
+            with open(registro["perfil"], "w") as f:
+                f.write("\n".join(str(e) for e in estatisticas) + "\n")
+
+        registro.update(pid=os.getpid(), fim=pd.Timestamp.now().isoformat())
+        _gravar(registro)
+
+
+def instrumentar(nome: str = None):
+    """
+    Decorador que mede cada chamada da função como uma etapa (ver `etapa`).
+    Linhas de entrada = soma das linhas dos DataFrames recebidos; linhas de
+    saída = linhas do resultado.
+    """
+    def decorador(funcao):
+        rotulo = nome or funcao.__name__
+
+        @functools.wraps(funcao)
+        def envolvida(*args, **kwargs):
+            if _CONFIG["arquivo"] is None:
+                return funcao(*args, **kwargs)
+
+            contagens = [contar_linhas(a) for a in list(args) + list(kwargs.values())
+                         if not isinstance(a, dict)]
+            contagens = [c for c in contagens if c is not None]
+            with etapa(rotulo, linhas_entrada=sum(contagens) if contagens else None) as registro:
+                resultado = funcao(*args, **kwargs)
+                registro["linhas_saida"] = contar_linhas(resultado)
+            return resultado
+
+        return envolvida
+
+    return decorador
+
+
+def ler_registros(arquivo: str) -> pd.DataFrame:
+    """Registros gravados pela instrumentação, como DataFrame."""
+    return pd.read_json(arquivo, lines=True)
+
+
+def resumir_registros(registros: pd.DataFrame) -> pd.DataFrame:
+    """Tempo total, CPU, chamadas e maior delta de memória por etapa."""
+    return (registros.groupby("etapa", sort=False)
+            .agg(chamadas=("etapa", "size"),
+                 segundos=("segundos", "sum"),
+                 cpu_segundos=("cpu_segundos", "sum"),
+                 delta_pico_mb=("delta_pico_mb", "max"),
+                 linhas_entrada=("linhas_entrada", lambda s: s.sum(min_count=1)),
+                 linhas_saida=("linhas_saida", lambda s: s.sum(min_count=1)))
+            .sort_values("segundos", ascending=False))
+
+
+if os.environ.get("PD_INSTRUMENTACAO"):
+    ativar_instrumentacao(os.environ["PD_INSTRUMENTACAO"],
+                          perfilar=os.environ.get("PD_PERFILAR"),
+                          perfilador=os.environ.get("PD_PERFILADOR", "cprofile"))
@@ -2,11 +2,14 @@ import os
 import pandas as pd
 import numpy as np
 
+from pipeline.instrumentacao import etapa, instrumentar
+
 # -------------------------------------
 # CLIENTES
 # -------------------------------------
 
 
+@instrumentar()
 def preprocessar_clientes(
     df_cli: pd.DataFrame,
     id_col="id_cliente",
@@ -65,6 +68,7 @@ def preprocessar_clientes(
 # -------------------------------------
 
 
+@instrumentar()
 def preprocessar_inadimplencia(
     df_inad: pd.DataFrame,
     id_col="id_cliente",
@@ -106,6 +110,7 @@ def preprocessar_inadimplencia(
 # -------------------------------------
 
 
+@instrumentar()
 def preprocessar_transacoes(
     df_tx: pd.DataFrame,
     id_col="id_cliente",
@@ -121,7 +126,8 @@ def preprocessar_transacoes(
 
     df[id_col] = df[id_col].astype(str)
 
-    df[dt_col] = pd.to_datetime(df[dt_col], format="%d/%m/%Y", errors="coerce")
+    with etapa("converter_datas", linhas_entrada=len(df)):
+        df[dt_col] = pd.to_datetime(df[dt_col], format="%d/%m/%Y", errors="coerce")
 
     df["mes_safra"] = df[dt_col].dt.to_period("M").astype(str)
 
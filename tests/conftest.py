@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.carregar_dados import carregar_dados
+from pipeline.preprocess import (preprocessar_clientes, preprocessar_inadimplencia,
+                                 preprocessar_transacoes)
+
+PASTA_RAW = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "data", "raw")
+
+# Linhas de df_inad comparadas com as implementações linha a linha (lentas:
+# ~5 ms por linha e família)
+N_AMOSTRA = 200
+
+
+@pytest.fixture(scope="session")
+def dados_raw():
+    """Bases originais de data/raw pré-processadas, como no notebook."""
+    dados = carregar_dados(PASTA_RAW, cache=False)
+    df_cli = preprocessar_clientes(dados["clientes"])
+    df_inad = (preprocessar_inadimplencia(dados["inadimplencia"])
+               .dropna(subset=["atraso_90d"]).reset_index(drop=True))
+    df_tx = preprocessar_transacoes(dados["transacoes"])
+    return df_cli, df_inad, df_tx
+
+
+@pytest.fixture(scope="session")
+def amostra_raw(dados_raw):
+    """data/raw com uma amostra de df_inad (transações completas)."""
+    df_cli, df_inad, df_tx = dados_raw
+    inad = df_inad.sample(N_AMOSTRA, random_state=0).sort_index().reset_index(drop=True)
+    return df_cli, inad, df_tx
+
+
+@pytest.fixture(scope="session")
+def dados_borda(dados_raw):
+    """
+    data/raw com casos de borda:
+    - transações com data inválida (NaT) e um cliente só com datas NaT;
+    - clientes sem nenhuma transação (C0003, C0004) e um cliente fora do cadastro;
+    - datas empatadas (transações duplicadas com outro valor);
+    - valor_transacao nulo;
+    - transações fora de ordem.
+    """
+    df_cli, df_inad, df_tx = dados_raw
+    rng = np.random.default_rng(0)
+
+    tx = df_tx.copy()
+    tx.loc[tx.sample(30, random_state=1).index, "data_transacao"] = pd.NaT
+    tx.loc[tx.sample(30, random_state=2).index, "valor_transacao"] = np.nan
+    empates = tx.sample(200, random_state=3)
+    empates = empates.assign(valor_transacao=rng.normal(1000, 500, len(empates)).round(2))
+    so_nat = pd.DataFrame({"id_cliente": ["ZNAT", "ZNAT"],
+                           "data_transacao": pd.to_datetime([pd.NaT, pd.NaT]),
+                           "mes_safra": ["NaT", "NaT"],
+                           "valor_transacao": [1.0, 2.0]})
+    tx = pd.concat([tx, empates, so_nat], ignore_index=True)
+    tx = tx[~tx["id_cliente"].isin(["C0003", "C0004"])]
+    tx = tx.sample(frac=1, random_state=4).reset_index(drop=True)
+
+    inad = df_inad.sample(N_AMOSTRA, random_state=5).sort_index()
+    sem_tx = df_inad[df_inad["id_cliente"].isin(["C0003", "C0004"])].head(6)
+    inad = pd.concat([inad, sem_tx]).drop_duplicates(["id_cliente", "data_referencia"])
+    inad = inad.reset_index(drop=True)
+    # clientes trocados só nas safras que não colidem com outra linha
+    inad.loc[[0, 1, 2], "id_cliente"] = "ZNAT"
+    inad.loc[[3, 4], "id_cliente"] = "ZZZ"
+    inad = inad.drop_duplicates(["id_cliente", "data_referencia"]).reset_index(drop=True)
+
+    return df_cli, inad, tx
+
+
+@pytest.fixture(scope="session", params=["amostra_raw", "dados_borda"])
+def dados(request):
+    """Os dois conjuntos comparados com as implementações de referência."""
+    return request.getfixturevalue(request.param)
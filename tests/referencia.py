@@ -0,0 +1,53 @@
+"""
+Referências para os testes de paridade: a ABT montada como no gerar_abt
+original (merge das famílias calculadas linha a linha, vetorizado=False).
+"""
+import pandas as pd
+
+from features.features_clientes import features_clientes
+from features.features_valor import features_valor_flex
+from features.features_quantidade import features_quantidade_flex
+from features.features_tempo import features_tempo_flex
+from features.features_flags import features_flags_flex
+
+CHAVES = ["id_cliente", "data_referencia"]
+
+FAMILIAS = {
+    "valor": features_valor_flex,
+    "quantidade": features_quantidade_flex,
+    "tempo": features_tempo_flex,
+    "flags": features_flags_flex,
+}
+
+_MEMO = {}
+
+
+def familia_referencia(familia, df_tx, df_inad, usar_M_1=True, janelas=None):
+    """Família transacional linha a linha (memorizada entre os testes da sessão)."""
+    chave = (familia, id(df_tx), id(df_inad), usar_M_1, repr(janelas))
+    if chave not in _MEMO:
+        _MEMO[chave] = FAMILIAS[familia](df_tx, df_inad, usar_M_1=usar_M_1,
+                                         janelas=janelas, vetorizado=False)
+    return _MEMO[chave]
+
+
+def abt_referencia(df_cli, df_inad, df_tx, usar_M_1=True, janelas=None):
+    """ABT do gerar_abt original: df_inad + merge left de cada família."""
+    abt = df_inad.merge(features_clientes(df_cli, df_inad, usar_M_1=usar_M_1,
+                                          vetorizado=False),
+                        on=CHAVES, how="left")
+    for familia in FAMILIAS:
+        abt = abt.merge(familia_referencia(familia, df_tx, df_inad, usar_M_1, janelas),
+                        on=CHAVES, how="left")
+    return abt
+
+
+def comparar(obtido: pd.DataFrame, esperado: pd.DataFrame):
+    """
+    Mesmas colunas (na mesma ordem), linhas e valores. Os dtypes podem diferir
+    (ex.: int64 na versão vetorizada e float64 na linha a linha).
+    """
+    assert list(obtido.columns) == list(esperado.columns)
+    pd.testing.assert_frame_equal(obtido.reset_index(drop=True),
+                                  esperado.reset_index(drop=True),
+                                  check_dtype=False, rtol=1e-9, atol=1e-6)
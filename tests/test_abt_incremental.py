@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+from pipeline.abt_incremental import atualizar_abt
+from pipeline.criar_abt import CHAVES_ABT, montar_abt, ler_abt_particionada
+
+
+def _ordenar(abt):
+    return abt.sort_values(CHAVES_ABT).reset_index(drop=True)
+
+
+def _separar(df_tx, mascara_novas):
+    """Histórico anterior e transações chegadas depois (df_tx completo inclui as duas)."""
+    return df_tx[~mascara_novas], df_tx[mascara_novas]
+
+
+def _clientes_com_tx(df_tx, n):
+    contagem = df_tx.dropna(subset=["data_transacao"])["id_cliente"].value_counts()
+    return list(contagem[contagem >= 3].index[:n])
+
+
+@pytest.fixture
+def cenarios(dados_raw):
+    """
+    Transações novas de três tipos, cada uma sobre clientes diferentes:
+    - primeira transação do cliente (antes ele não tinha nenhuma);
+    - transação atrasada anterior à primeira transação já conhecida;
+    - transação atrasada na data mais recente do cliente.
+    """
+    _, _, df_tx = dados_raw
+    novo, antecipado, atrasado = [[c] for c in _clientes_com_tx(df_tx, 3)]
+    datas = df_tx["data_transacao"]
+    por_cliente = df_tx.groupby("id_cliente")["data_transacao"]
+
+    primeira = datas == por_cliente.transform("min")
+    ultima = datas == por_cliente.transform("max")
+    return {
+        "cliente_novo": df_tx["id_cliente"].isin(novo).to_numpy(),
+        "antes_da_primeira": (df_tx["id_cliente"].isin(antecipado) & primeira).to_numpy(),
+        "atrasada": (df_tx["id_cliente"].isin(atrasado) & ~primeira & ultima).to_numpy(),
+    }
+
+
+@pytest.mark.parametrize("cenario", ["cliente_novo", "antes_da_primeira", "atrasada"])
+@pytest.mark.parametrize("usar_M_1", [True, False])
+def test_atualizar_abt_igual_reconstrucao(dados_raw, cenarios, cenario, usar_M_1, tmp_path):
+    df_cli, df_inad, df_tx = dados_raw
+    anteriores, novas = _separar(df_tx, cenarios[cenario])
+    assert len(novas)
+
+    diretorio = str(tmp_path / "abt")
+    atualizar_abt(df_cli, df_inad, anteriores, diretorio, usar_M_1=usar_M_1)
+    recalculadas = atualizar_abt(df_cli, df_inad, df_tx, diretorio, tx_novas=novas,
+                                 usar_M_1=usar_M_1)
+    assert len(recalculadas) < len(df_inad)
+
+    # colunas com NaN em alguma partição gravada antes voltam como float
+    esperado = montar_abt(df_cli, df_inad, df_tx, usar_M_1=usar_M_1)
+    pd.testing.assert_frame_equal(_ordenar(ler_abt_particionada(diretorio)),
+                                  _ordenar(esperado), check_dtype=False)
+
+
+def test_atualizar_abt_safra_nova(dados_raw, tmp_path):
+    df_cli, df_inad, df_tx = dados_raw
+    ultima = df_inad["mes_safra"].max()
+    diretorio = str(tmp_path / "abt")
+    atualizar_abt(df_cli, df_inad[df_inad["mes_safra"] != ultima], df_tx, diretorio)
+    recalculadas = atualizar_abt(df_cli, df_inad, df_tx, diretorio)
+
+    assert (recalculadas["mes_safra"] == ultima).all()
+    pd.testing.assert_frame_equal(_ordenar(ler_abt_particionada(diretorio)),
+                                  _ordenar(montar_abt(df_cli, df_inad, df_tx)))
@@ -0,0 +1,134 @@
+import os
+
+import pandas as pd
+import pytest
+
+import pipeline.criar_abt as criar_abt
+from pipeline.criar_abt import (gerar_abt, montar_abt, montar_abts, gerar_abt_em_lotes,
+                                ler_abt_particionada)
+from pipeline.cache_features import CacheFeatures
+from pipeline.esquema_abt import compactar_abt
+from tests.referencia import abt_referencia, comparar
+
+
+@pytest.mark.parametrize("janelas", [None, [1, 2, 5, 18, 36]])
+@pytest.mark.parametrize("usar_M_1", [True, False])
+def test_gerar_abt_igual_referencia(dados, usar_M_1, janelas):
+    df_cli, df_inad, df_tx = dados
+    esperado = abt_referencia(df_cli, df_inad, df_tx, usar_M_1, janelas)
+    for fundido in [True, False]:
+        abt = gerar_abt(df_cli, df_inad, df_tx, usar_M_1=usar_M_1, fundido=fundido,
+                        janelas=janelas, destino=None)
+        comparar(abt, esperado)
+
+
+@pytest.mark.parametrize("usar_M_1", [True, False])
+def test_gerar_abt_cubo_igual_referencia(dados, usar_M_1, tmp_path):
+    df_cli, df_inad, df_tx = dados
+    esperado = abt_referencia(df_cli, df_inad, df_tx, usar_M_1, None)
+    for fundido in [True, False]:
+        abt = gerar_abt(df_cli, df_inad, df_tx, usar_M_1=usar_M_1, fundido=fundido,
+                        cubo=True, destino=None)
+        comparar(abt, esperado)
+
+    # cubo persistido: a segunda execução lê o cubo gravado na primeira
+    pasta = str(tmp_path / "cubos")
+    for _ in range(2):
+        abt = gerar_abt(df_cli, df_inad, df_tx, usar_M_1=usar_M_1, cubo=pasta, destino=None)
+        comparar(abt, esperado)
+    assert len(os.listdir(pasta)) == 1
+
+
+def test_gerar_abt_paralelo_igual_serial(dados_raw):
+    df_cli, df_inad, df_tx = dados_raw
+    serial = gerar_abt(df_cli, df_inad, df_tx, destino=None)
+    paralelo = gerar_abt(df_cli, df_inad, df_tx, n_jobs=2, n_shards=3, destino=None)
+    pd.testing.assert_frame_equal(paralelo, serial)
+    paralelo = gerar_abt(df_cli, df_inad, df_tx, n_jobs=2, n_shards=3, cubo=True,
+                         destino=None)
+    pd.testing.assert_frame_equal(paralelo, serial)
+
+
+def test_montar_abts_igual_por_politica(dados_raw):
+    df_cli, df_inad, df_tx = dados_raw
+    abts = montar_abts(df_cli, df_inad, df_tx, politicas=(True, False))
+    pd.testing.assert_frame_equal(abts["M1"], montar_abt(df_cli, df_inad, df_tx, usar_M_1=True))
+    pd.testing.assert_frame_equal(abts["M"], montar_abt(df_cli, df_inad, df_tx, usar_M_1=False))
+
+
+def test_colunas_selecionadas_iguais_abt_completa(dados_raw):
+    df_cli, df_inad, df_tx = dados_raw
+    completa = montar_abt(df_cli, df_inad, df_tx)
+    colunas = ["idade", "vlr_trans_3m", "comp_vlr_6m_vs_9m", "pct_qtde_trans_12m",
+               "tempo_desde_ultima_ever", "flag_transacao_24m"]
+    parcial = montar_abt(df_cli, df_inad, df_tx, colunas=colunas)
+    pd.testing.assert_frame_equal(parcial, completa[list(df_inad.columns) + colunas])
+
+
+def test_cache_igual_calculo(dados_raw, tmp_path):
+    df_cli, df_inad, df_tx = dados_raw
+    esperado = montar_abt(df_cli, df_inad, df_tx)
+    cache = CacheFeatures(str(tmp_path))
+    for _ in range(2):  # a segunda execução lê todas as famílias do cache
+        pd.testing.assert_frame_equal(montar_abt(df_cli, df_inad, df_tx, cache=cache),
+                                      esperado)
+
+
+def test_lotes_com_cache_hash_unico(dados_raw, tmp_path, monkeypatch):
+    df_cli, df_inad, df_tx = dados_raw
+    esperado = list(gerar_abt_em_lotes(df_cli, df_inad, df_tx))
+
+    hashes = []
+    original = criar_abt.hash_entrada
+    monkeypatch.setattr(criar_abt, "hash_entrada",
+                        lambda dados: hashes.append(type(dados).__name__) or original(dados))
+    cache = CacheFeatures(str(tmp_path))
+    for _ in range(2):  # a segunda execução lê todos os lotes do cache
+        for lote, abt in zip(esperado, gerar_abt_em_lotes(df_cli, df_inad, df_tx, cache=cache)):
+            pd.testing.assert_frame_equal(abt, lote)
+    assert hashes.count("IndiceTransacoes") == 2
+
+
+@pytest.mark.parametrize("por", ["mes_safra", "cliente"])
+def test_lotes_iguais_abt_completa(dados_raw, por):
+    df_cli, df_inad, df_tx = dados_raw
+    esperado = montar_abt(df_cli, df_inad, df_tx)
+    lotes = pd.concat(gerar_abt_em_lotes(df_cli, df_inad, df_tx, por=por, n_shards=4))
+    lotes = lotes.set_index(["id_cliente", "data_referencia"])
+    lotes = lotes.loc[pd.MultiIndex.from_frame(esperado[["id_cliente", "data_referencia"]])]
+    pd.testing.assert_frame_equal(lotes.reset_index()[list(esperado.columns)], esperado)
+
+
+def test_gravacao_particionada(dados_raw, tmp_path):
+    df_cli, df_inad, df_tx = dados_raw
+    abt = gerar_abt(df_cli, df_inad, df_tx, destino=str(tmp_path), particionar=True)
+    lida = ler_abt_particionada(str(tmp_path / "abt_M1"))
+    ordem = abt.sort_values(["mes_safra", "id_cliente"]).reset_index(drop=True)
+    lida = lida.sort_values(["mes_safra", "id_cliente"]).reset_index(drop=True)
+    pd.testing.assert_frame_equal(lida, ordem)
+
+
+def test_compactar_preserva_valores(dados_raw):
+    df_cli, df_inad, df_tx = dados_raw
+    abt = montar_abt(df_cli, df_inad, df_tx)
+    compacta = compactar_abt(abt)
+    assert compacta.memory_usage(deep=True).sum() < abt.memory_usage(deep=True).sum()
+    restaurada = compacta.astype({c: abt[c].dtype for c in abt.columns})
+    pd.testing.assert_frame_equal(restaurada, abt, rtol=1e-6)
+
+
+def test_compactar_contagem_fora_do_int16():
+    abt = pd.DataFrame({"qtde_trans_ever": [3.0, None, 40000.0],
+                        "qtde_trans_1m": [0, 1, 2],
+                        "delta_qtde_1m_vs_3m": [-2.0**31 - 1, 0.0, 1.0],
+                        "flag_completo_3m": [0.0, 1.0, 0.5]})
+    compacta = compactar_abt(abt)
+    assert compacta.dtypes.astype(str).tolist() == ["Int32", "Int16", "Int64", "float64"]
+    pd.testing.assert_frame_equal(compacta.astype(abt.dtypes.to_dict()), abt)
+
+
+@pytest.mark.parametrize("n_jobs, n_shards", [(0, None), (-2, None), (2, 0), (1, -1)])
+def test_paralelismo_invalido(amostra_raw, n_jobs, n_shards):
+    df_cli, df_inad, df_tx = amostra_raw
+    with pytest.raises(ValueError, match="n_jobs|n_shards"):
+        gerar_abt(df_cli, df_inad, df_tx, n_jobs=n_jobs, n_shards=n_shards, destino=None)
@@ -0,0 +1,70 @@
+import pytest
+
+from features.features_clientes import features_clientes
+from features.features_transacionais import features_transacionais
+from features.indice_transacoes import IndiceTransacoes
+from features.cubo_mensal import CuboMensal
+from tests.referencia import FAMILIAS, CHAVES, familia_referencia, comparar
+
+# Conjunto padrão e um conjunto com janelas fora do padrão (2m, 5m, 18m, 36m)
+JANELAS = [None, [1, 2, 5, 18, 36]]
+
+
+@pytest.mark.parametrize("usar_M_1", [True, False])
+def test_features_clientes_igual_linha_a_linha(dados, usar_M_1):
+    df_cli, df_inad, _ = dados
+    comparar(features_clientes(df_cli, df_inad, usar_M_1=usar_M_1),
+             features_clientes(df_cli, df_inad, usar_M_1=usar_M_1, vetorizado=False))
+
+
+@pytest.mark.parametrize("janelas", JANELAS)
+@pytest.mark.parametrize("usar_M_1", [True, False])
+@pytest.mark.parametrize("familia", list(FAMILIAS))
+def test_familia_igual_linha_a_linha(dados, familia, usar_M_1, janelas):
+    _, df_inad, df_tx = dados
+    esperado = familia_referencia(familia, df_tx, df_inad, usar_M_1, janelas)
+    obtido = FAMILIAS[familia](df_tx, df_inad, usar_M_1=usar_M_1, janelas=janelas)
+    comparar(obtido, esperado)
+
+
+@pytest.mark.parametrize("familia", list(FAMILIAS))
+def test_familia_sobre_indice(dados, familia):
+    _, df_inad, df_tx = dados
+    indice = IndiceTransacoes(df_tx)
+    comparar(FAMILIAS[familia](indice, df_inad, usar_M_1=True),
+             familia_referencia(familia, df_tx, df_inad, True))
+
+
+@pytest.mark.parametrize("janelas", JANELAS)
+@pytest.mark.parametrize("usar_M_1", [True, False])
+def test_kernel_fundido_igual_familias(dados, usar_M_1, janelas):
+    _, df_inad, df_tx = dados
+    fundido = features_transacionais(df_tx, df_inad, usar_M_1=usar_M_1, janelas=janelas)
+
+    colunas = list(CHAVES)
+    for familia in FAMILIAS:
+        esperado = familia_referencia(familia, df_tx, df_inad, usar_M_1, janelas)
+        colunas += [c for c in esperado.columns if c not in CHAVES]
+        comparar(fundido[list(esperado.columns)], esperado)
+    assert list(fundido.columns) == colunas
+
+
+@pytest.mark.parametrize("usar_M_1", [True, False])
+@pytest.mark.parametrize("familia", ["quantidade", "valor", "tempo", "flags"])
+def test_familia_sobre_cubo(dados, familia, usar_M_1):
+    _, df_inad, df_tx = dados
+    cubo = CuboMensal.de_transacoes(df_tx)
+    comparar(FAMILIAS[familia](cubo, df_inad, usar_M_1=usar_M_1),
+             familia_referencia(familia, df_tx, df_inad, usar_M_1))
+
+
+def test_cubo_persistido(dados, tmp_path):
+    _, df_inad, df_tx = dados
+    cubo = CuboMensal.de_transacoes(df_tx)
+    esperado = FAMILIAS["quantidade"](cubo, df_inad, usar_M_1=True)
+    for formato in ["npy", "parquet"]:
+        cubo.salvar(str(tmp_path / formato), formato=formato)
+        lido = CuboMensal.carregar(str(tmp_path / formato))
+        comparar(FAMILIAS["quantidade"](lido, df_inad, usar_M_1=True), esperado)
+        comparar(FAMILIAS["valor"](lido, df_inad, usar_M_1=True),
+                 FAMILIAS["valor"](cubo, df_inad, usar_M_1=True))
@@ -0,0 +1,135 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import pipeline.ingestao_transacoes as ingestao
+from pipeline.ingestao_transacoes import ingerir_transacoes, ler_transacoes, ler_csv_em_blocos
+from pipeline.preprocess import preprocessar_transacoes
+from tests.conftest import PASTA_RAW
+
+COLUNAS = ["id_cliente", "data_transacao", "valor_transacao"]
+# blocos pequenos: o arquivo de exemplo vira vários blocos/partes
+BLOCO_MB = 0.01
+
+
+def _esperado(caminho):
+    bruto = pd.concat(list(ler_csv_em_blocos(caminho)), ignore_index=True)
+    return preprocessar_transacoes(bruto)
+
+
+def _ordenar(df):
+    return df[COLUNAS].sort_values(COLUNAS).reset_index(drop=True)
+
+
+def _comparar(diretorio, caminho):
+    lido = ler_transacoes(diretorio)
+    assert len(lido) == len(_esperado(caminho))
+    pd.testing.assert_frame_equal(_ordenar(lido), _ordenar(_esperado(caminho)),
+                                  check_dtype=False)
+
+
+def _crescer(csv):
+    with open(csv, "a") as f:
+        f.write("C9999;123.45;15/06/2024\n")
+
+
+@pytest.fixture
+def csv(tmp_path):
+    caminho = str(tmp_path / "transacoes_case.csv")
+    shutil.copy(os.path.join(PASTA_RAW, "transacoes_case.csv"), caminho)
+    return caminho
+
+
+def test_reingestao_de_arquivo_que_cresceu(csv, tmp_path):
+    destino = str(tmp_path / "transacoes")
+    primeira = ingerir_transacoes(csv, destino, BLOCO_MB)
+    assert primeira["blocos"] > 1
+    _comparar(destino, csv)
+
+    _crescer(csv)
+    resumo = ingerir_transacoes(csv, destino, BLOCO_MB)
+    assert not resumo["ignorado"]
+    assert resumo["linhas"] == primeira["linhas"] + 1
+    _comparar(destino, csv)
+    assert len(ingestao._ler_manifesto(destino)) == 1
+
+
+def test_reingestao_forcada_nao_duplica(csv, tmp_path):
+    destino = str(tmp_path / "transacoes")
+    ingerir_transacoes(csv, destino, BLOCO_MB)
+    assert ingerir_transacoes(csv, destino, BLOCO_MB)["ignorado"]
+    ingerir_transacoes(csv, destino, BLOCO_MB, forcar=True)
+    _comparar(destino, csv)
+
+
+def test_falha_na_reingestao_preserva_dataset(csv, tmp_path, monkeypatch):
+    destino = str(tmp_path / "transacoes")
+    ingerir_transacoes(csv, destino, BLOCO_MB)
+    antes = ler_transacoes(destino)
+
+    original = ingestao.preprocessar_transacoes
+    chamadas = []
+
+    def falhar_no_segundo_bloco(bruto):
+        chamadas.append(len(bruto))
+        if len(chamadas) == 2:
+            raise RuntimeError("falha simulada")
+        return original(bruto)
+
+    monkeypatch.setattr(ingestao, "preprocessar_transacoes", falhar_no_segundo_bloco)
+    with pytest.raises(RuntimeError):
+        ingerir_transacoes(csv, destino, BLOCO_MB, forcar=True)
+
+    pd.testing.assert_frame_equal(ler_transacoes(destino), antes)
+    assert not [nome for nome in os.listdir(destino) if nome.startswith("_preparo")]
+
+
+def test_falha_ao_mover_partes_preserva_dataset(csv, tmp_path, monkeypatch):
+    destino = str(tmp_path / "transacoes")
+    ingerir_transacoes(csv, destino, BLOCO_MB)
+    antes = ler_transacoes(destino)
+    manifesto = ingestao._ler_manifesto(destino)
+
+    _crescer(csv)
+    original = ingestao._mover_preparo
+
+    def mover_e_falhar(diretorio, preparo):
+        original(diretorio, preparo)
+        raise OSError("falha simulada")
+
+    monkeypatch.setattr(ingestao, "_mover_preparo", mover_e_falhar)
+    with pytest.raises(OSError):
+        ingerir_transacoes(csv, destino, BLOCO_MB)
+    monkeypatch.undo()
+
+    assert ingestao._ler_manifesto(destino) == manifesto
+    pd.testing.assert_frame_equal(ler_transacoes(destino), antes)
+
+    ingerir_transacoes(csv, destino, BLOCO_MB)
+    _comparar(destino, csv)
+
+
+def test_falha_ao_remover_partes_antigas_e_concluida_na_leitura(csv, tmp_path, monkeypatch):
+    destino = str(tmp_path / "transacoes")
+    ingerir_transacoes(csv, destino, BLOCO_MB)
+
+    _crescer(csv)
+    remover = os.remove
+    chamadas = []
+
+    def falhar_na_segunda_remocao(caminho):
+        chamadas.append(caminho)
+        if len(chamadas) == 2:
+            raise OSError("falha simulada")
+        remover(caminho)
+
+    monkeypatch.setattr(ingestao.os, "remove", falhar_na_segunda_remocao)
+    with pytest.raises(OSError):
+        ingerir_transacoes(csv, destino, BLOCO_MB)
+    monkeypatch.undo()
+
+    assert "substitui" in ingestao._ler_manifesto(destino)[0]
+    _comparar(destino, csv)
+    assert "substitui" not in ingestao._ler_manifesto(destino)[0]
@@ -0,0 +1,24 @@
+import pipeline.instrumentacao as instrumentacao_mod
+from pipeline.carregar_dados import carregar_dados
+from pipeline.instrumentacao import instrumentacao, ler_registros
+from tests.conftest import PASTA_RAW
+
+
+def test_carregar_dados_instrumentado(tmp_path, monkeypatch):
+    zerados = []
+    original = instrumentacao_mod.zerar_pico_rss
+    monkeypatch.setattr(instrumentacao_mod, "zerar_pico_rss",
+                        lambda: zerados.append(1) or original())
+
+    arquivo = str(tmp_path / "etapas.jsonl")
+    with instrumentacao(arquivo):
+        carregar_dados(PASTA_RAW, cache=False, n_threads=3)
+
+    registros = ler_registros(arquivo)
+    leituras = registros[registros["etapa"] == "ler_csv"]
+    assert len(leituras) == 3
+    assert (leituras["etapa_pai"] == "carregar_dados").all()
+    assert registros.loc[registros["etapa"] == "carregar_dados", "etapa_pai"].isna().all()
+    assert (registros["delta_pico_mb"] >= 0).all()
+    # as leituras em threads não zeram o pico que carregar_dados está medindo
+    assert len(zerados) == 1